@@ -0,0 +1,247 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import timeit
+from game import Game
+from mansion import Mansion
+from main import fix_character_name, handle_suggestion_command
+from simulate import play_game
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+THRESHOLD = 0.10
+REPEAT = 5
+
+_benchmarks = {}
+
+
+def benchmark(function):
+    _benchmarks[function.__name__[len("bench_"):]] = function
+    return function
+
+
+# Each benchmark sets up its own state and returns (run, operations per run)
+
+@benchmark
+def bench_mansion_init():
+    rng = random.Random(0)
+    return lambda: Mansion(rng), 1
+
+
+@benchmark
+def bench_game_init():
+    rng = random.Random(0)
+    return lambda: Game(4, sink=None, rng=rng), 1
+
+
+@benchmark
+def bench_next_moves():
+    mansion = Mansion(random.Random(0))
+    rooms = mansion.rooms
+
+    def run():
+        for room in rooms:
+            mansion.next_moves(room)
+    return run, len(rooms)
+
+
+@benchmark
+def bench_is_valid_move():
+    mansion = Mansion(random.Random(0))
+    pairs = [(a, b) for a in mansion.rooms for b in mansion.rooms]
+
+    def run():
+        for from_room, to_room in pairs:
+            mansion.is_valid_move(from_room, to_room)
+    return run, len(pairs)
+
+
+@benchmark
+def bench_reachable_rooms():
+    mansion = Mansion(random.Random(0))
+    queries = [(room, roll) for room in mansion.rooms for roll in range(1, 7)]
+
+    def run():
+        for room, roll in queries:
+            mansion.reachable_rooms(room, roll)
+    return run, len(queries)
+
+
+@benchmark
+def bench_move_player():
+    game = Game(4, sink=None, rng=random.Random(0))
+    player = game.players[0]
+    moves = [(room, target.name) for room in game.mansion.rooms
+             for target in game.mansion.next_moves(room)]
+
+    def run():
+        for room, target_name in moves:
+            player.position = room
+            player.must_suggest = False
+            game.remain_moves = 6
+            game.move_player(player, target_name)
+    return run, len(moves)
+
+
+@benchmark
+def bench_make_suggestion():
+    game = Game(4, sink=None, rng=random.Random(0))
+    player = game.players[0]
+    mansion = game.mansion
+    suggestions = [(room, character.name, weapon.name) for room in mansion.template.main_rooms
+                   for character in mansion.characters for weapon in mansion.weapons]
+
+    def run():
+        for room, character_name, weapon_name in suggestions:
+            player.position = room
+            player.must_suggest = True
+            game.make_suggestion(player, character_name, weapon_name)
+    return run, len(suggestions)
+
+
+@benchmark
+def bench_fix_character_name():
+    names = ["Miss Scarlett", "scarlett", "COL MUSTARD", "mrs white", "green",
+             "Mrs. Peacock", "prof plum", "nobody"]
+
+    def run():
+        for name in names:
+            fix_character_name(name)
+    return run, len(names)
+
+
+@benchmark
+def bench_suggestion_command():
+    game = Game(4, sink=None, rng=random.Random(0))
+    player = game.players[0]
+    room = game.mansion.template.main_rooms[0]
+    commands = [command.split() for command in (
+        "suggest Miss Scarlett Revolver",
+        "suggest mustard lead pipe",
+        "suggest Reverend Green candle",
+        "suggest prof plum Rope",
+    )]
+
+    def run():
+        for parts in commands:
+            player.position = room
+            player.must_suggest = True
+            handle_suggestion_command(game, player, parts)
+    return run, len(commands)
+
+
+@benchmark
+def bench_full_game():
+    seeds = iter(range(sys.maxsize))
+    return lambda: play_game(4, sink=None, seed=next(seeds)), 1
+
+
+def measure(setup, repeat=REPEAT, min_time=0.2):
+    # Best of repeat timings, in microseconds per operation
+    run, operations = setup()
+    timer = timeit.Timer(run)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)) + 1)
+    best = min([elapsed] + timer.repeat(repeat - 1, number))
+    return best / number / operations * 1e6
+
+
+def run_benchmarks(names=None, repeat=REPEAT, min_time=0.2):
+    results = {}
+    for name, setup in _benchmarks.items():
+        if names and not any(part in name for part in names):
+            continue
+        results[name] = measure(setup, repeat, min_time)
+    return results
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    # (name, baseline us, current us, relative change, regressed) per shared benchmark
+    rows = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        change = current / before - 1
+        rows.append((name, before, current, change, change > threshold))
+    return rows
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def platform_differences(baseline):
+    # Timings from another interpreter or CPU type only hint at regressions
+    current = {"python": platform.python_version(), "machine": platform.machine()}
+    return [f"{key} {baseline.get(key)} -> {value}" for key, value in current.items()
+            if baseline.get(key) != value]
+
+
+def save_baseline(path, results):
+    data = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the engine hot paths")
+    parser.add_argument("names", nargs="*", help="only run benchmarks whose names contain these")
+    parser.add_argument("--save", nargs="?", const=BASELINE, default=None,
+                        help=f"write the results as a baseline (default {os.path.basename(BASELINE)})")
+    parser.add_argument("--compare", nargs="?", const=BASELINE, default=None,
+                        help="compare against a baseline and fail on regressions "
+                             "(only warn if it was saved on another python or machine)")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="slowdown that counts as a regression (0.10 = 10%%)")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="seconds each timing runs for")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.names, args.repeat, args.min_time)
+
+    if args.compare:
+        baseline = load_baseline(args.compare)
+        rows = compare(results, baseline["results"], args.threshold)
+        print(f"{'benchmark':<20} {'baseline us':>12} {'now us':>12} {'change':>8}")
+        for name, before, current, change, regressed in rows:
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{name:<20} {before:>12.2f} {current:>12.2f} {change:>+8.1%}{flag}")
+        regressions = [row[0] for row in rows if row[4]]
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        differences = platform_differences(baseline)
+        if regressions and differences:
+            print(f"Warning: baseline is from another platform ({', '.join(differences)}); "
+                  f"not failing. Run --save here for a local baseline.")
+            regressions = []
+    else:
+        print(f"{'benchmark':<20} {'us/op':>12} {'ops/s':>12}")
+        for name, us in results.items():
+            print(f"{name:<20} {us:>12.2f} {1e6 / us:>12.0f}")
+        regressions = []
+
+    if args.save:
+        save_baseline(args.save, results)
+        print(f"\nSaved baseline to {args.save}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
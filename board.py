@@ -0,0 +1,199 @@
+from array import array
+from collections import deque
+
+MAX_ROLL = 6
+# Boards up to this size get every shortest path worked out up front; bigger
+# ones compute rows on demand and keep the most recent ROW_CACHE of them
+PRECOMPUTE_ROOMS = 256
+ROW_CACHE = 512
+
+_compiled_boards = {}
+
+
+class BoardIndex:
+
+    def __init__(self, rooms):
+        self.names = [room.name for room in rooms]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.size = len(rooms)
+        self.main_rooms = 0
+        for i, room in enumerate(rooms):
+            if room.room_type == "main":
+                self.main_rooms |= 1 << i
+
+        # Compressed sparse rows: the exits of room i are targets[offsets[i]:offsets[i + 1]],
+        # with matching costs; secret passages are free in Game.move_player
+        self.offsets = array("I", [0])
+        self.targets = array("I")
+        self.costs = array("B")
+        for room in rooms:
+            for r in room.rooms_connection:
+                self.targets.append(self.index[r.name])
+                self.costs.append(1)
+            if room.secret_passage:
+                self.targets.append(self.index[room.secret_passage.name])
+                self.costs.append(0)
+            self.offsets.append(len(self.targets))
+
+        self._rows = {}
+        self._paths = {}
+        self._reach = {}
+        self.max_distance = None
+        if self.size <= PRECOMPUTE_ROOMS:
+            for source in range(self.size):
+                self._row(source)
+            finite = [d for distances, _ in self._rows.values() for d in distances if d >= 0]
+            self.max_distance = max(finite) if finite else 0
+
+    def exits(self, room):
+        start, stop = self.offsets[room], self.offsets[room + 1]
+        return list(zip(self.targets[start:stop], self.costs[start:stop]))
+
+    def is_exit(self, source, target):
+        for i in range(self.offsets[source], self.offsets[source + 1]):
+            if self.targets[i] == target:
+                return True
+        return False
+
+    def _row(self, source):
+        row = self._rows.get(source)
+        if row is None:
+            row = self._shortest_paths(source)
+            if len(self._rows) >= ROW_CACHE and self.size > PRECOMPUTE_ROOMS:
+                del self._rows[next(iter(self._rows))]
+            self._rows[source] = row
+        return row
+
+    def _shortest_paths(self, source):
+        # 0-1 BFS; distances are -1 where the room is unreachable
+        offsets, targets, costs = self.offsets, self.targets, self.costs
+        distances = array("i", [-1]) * self.size
+        parents = array("i", [-1]) * self.size
+        distances[source] = 0
+        queue = deque([source])
+        while queue:
+            current = queue.popleft()
+            base = distances[current]
+            start, stop = offsets[current], offsets[current + 1]
+            for neighbour, cost in zip(targets[start:stop], costs[start:stop]):
+                distance = base + cost
+                known = distances[neighbour]
+                if known < 0 or distance < known:
+                    distances[neighbour] = distance
+                    parents[neighbour] = current
+                    if cost:
+                        queue.append(neighbour)
+                    else:
+                        queue.appendleft(neighbour)
+        return distances, parents
+
+    def _nearby(self, source, limit):
+        # Same search, cut off at limit moves; only touches rooms that close
+        offsets, targets, costs = self.offsets, self.targets, self.costs
+        distances = {source: 0}
+        queue = deque([source])
+        while queue:
+            current = queue.popleft()
+            base = distances[current]
+            start, stop = offsets[current], offsets[current + 1]
+            for neighbour, cost in zip(targets[start:stop], costs[start:stop]):
+                distance = base + cost
+                if distance > limit:
+                    continue
+                known = distances.get(neighbour)
+                if known is None or distance < known:
+                    distances[neighbour] = distance
+                    if cost:
+                        queue.append(neighbour)
+                    else:
+                        queue.appendleft(neighbour)
+        return distances
+
+    def is_main(self, room):
+        return bool(self.main_rooms >> room & 1)
+
+    def distance(self, source, target):
+        distance = self._row(source)[0][target]
+        return distance if distance >= 0 else None
+
+    def path(self, source, target):
+        key = (source, target)
+        if key in self._paths:
+            return self._paths[key]
+
+        distances, parents = self._row(source)
+        path = None
+        if distances[target] >= 0:
+            path = []
+            current = target
+            while current != source:
+                path.append(current)
+                current = parents[current]
+            path.reverse()
+            path = tuple(path)
+        if len(self._paths) >= ROW_CACHE * 8 and self.size > PRECOMPUTE_ROOMS:
+            del self._paths[next(iter(self._paths))]
+        self._paths[key] = path
+        return path
+
+    def _reach_masks(self, source):
+        # masks[m]: rooms other than source within m moves, for m up to MAX_ROLL
+        if source in self._rows:
+            distances = enumerate(self._rows[source][0])
+        else:
+            distances = self._nearby(source, MAX_ROLL).items()
+        by_distance = [0] * (MAX_ROLL + 1)
+        for target, distance in distances:
+            if target != source and 0 <= distance <= MAX_ROLL:
+                by_distance[distance] |= 1 << target
+        masks = []
+        mask = 0
+        for rooms in by_distance:
+            mask |= rooms
+            masks.append(mask)
+        return masks
+
+    def reach_mask(self, source, moves):
+        if moves < 0:
+            return 0
+        if moves > MAX_ROLL:
+            distances = self._row(source)[0]
+            mask = 0
+            for target, distance in enumerate(distances):
+                if target != source and 0 <= distance <= moves:
+                    mask |= 1 << target
+            return mask
+        masks = self._reach.get(source)
+        if masks is None:
+            masks = self._reach_masks(source)
+            if len(self._reach) >= ROW_CACHE * 8 and self.size > PRECOMPUTE_ROOMS:
+                del self._reach[next(iter(self._reach))]
+            self._reach[source] = masks
+        return masks[moves]
+
+    def rooms_in_mask(self, mask):
+        indices = []
+        while mask:
+            low_bit = mask & -mask
+            indices.append(low_bit.bit_length() - 1)
+            mask ^= low_bit
+        return indices
+
+
+def board_signature(rooms):
+    return tuple(
+        (room.name,
+         room.room_type,
+         tuple(r.name for r in room.rooms_connection),
+         room.secret_passage.name if room.secret_passage else None)
+        for room in rooms
+    )
+
+
+def compile_board(rooms):
+    signature = board_signature(rooms)
+    board = _compiled_boards.get(signature)
+    if board is None:
+        board = BoardIndex(rooms)
+        _compiled_boards[signature] = board
+    return board
@@ -0,0 +1,82 @@
+import argparse
+import random
+import time
+from layout import Layout, generate_layout_data, validate_layout
+from board import compile_board
+from mansion import Mansion, MansionTemplate
+
+
+def timed(function, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def bench_board(main_rooms, queries, sources=64, seed=0):
+    rng = random.Random(seed)
+    data = generate_layout_data(main_rooms, rng)
+    results = {"main_rooms": main_rooms}
+
+    _, results["validate_ms"] = timed(lambda: validate_layout(data))
+    layout, results["layout_ms"] = timed(lambda: Layout(data))
+    board, results["compile_ms"] = timed(lambda: compile_board(layout.rooms))
+    template = MansionTemplate(layout)
+    mansion = Mansion(random.Random(seed), template)
+    results["rooms"] = board.size
+    results["exits"] = len(board.targets)
+
+    # Queries come from a handful of occupied rooms, as they would in play
+    rooms = mansion.rooms
+    occupied = [rng.choice(rooms) for _ in range(sources)]
+    sources = [rng.choice(occupied) for _ in range(queries)]
+    targets = [rng.choice(rooms) for _ in range(queries)]
+    rolls = [rng.randint(1, 6) for _ in range(queries)]
+    moves = [(room, rng.choice(mansion.next_moves(room))) for room in sources]
+
+    def valid_moves():
+        for from_room, to_room in moves:
+            mansion.is_valid_move(from_room, to_room)
+
+    def reachable():
+        for room, roll in zip(sources, rolls):
+            mansion.reachable_rooms(room, roll)
+
+    def distances():
+        for source, target in zip(sources, targets):
+            board.distance(source.index, target.index)
+
+    for name, function in (("is_valid_move_us", valid_moves),
+                           ("reachable_rooms_us", reachable),
+                           ("distance_us", distances)):
+        _, elapsed = timed(function)
+        results[name] = elapsed / queries * 1e6
+    # Second pass runs against warm caches
+    _, elapsed = timed(distances)
+    results["distance_warm_us"] = elapsed / queries * 1e6
+    for key in ("validate_ms", "layout_ms", "compile_ms"):
+        results[key] *= 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time board loading and queries on generated mansions")
+    parser.add_argument("--sizes", default="9,100,1000,5000",
+                        help="comma-separated numbers of main rooms")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--sources", type=int, default=64,
+                        help="distinct rooms the queries start from")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'main':>6} {'rooms':>6} {'valid ms':>9} {'layout ms':>10} {'compile ms':>11} "
+          f"{'move us':>8} {'reach us':>9} {'dist us':>8} {'warm us':>8}")
+    for size in (int(size) for size in args.sizes.split(",") if size):
+        r = bench_board(size, args.queries, args.sources, args.seed)
+        print(f"{r['main_rooms']:>6} {r['rooms']:>6} {r['validate_ms']:>9.2f} {r['layout_ms']:>10.2f} "
+              f"{r['compile_ms']:>11.2f} {r['is_valid_move_us']:>8.2f} {r['reachable_rooms_us']:>9.2f} "
+              f"{r['distance_us']:>8.2f} {r['distance_warm_us']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from cards import count_cards
+from events import FanoutSink
+from knowledge import Knowledge
+from scoring import score_suggestions
+
+TIME_BUDGET = 0.05
+# Rollouts per decision when a bot is seeded: about what TIME_BUDGET buys, but
+# the same on every run and every machine
+ITERATIONS = 100
+HORIZON = 12
+TOP_SUGGESTIONS = 6
+EXPLORATION = 1.4
+
+_executor = None
+_executor_workers = 0
+
+
+def get_executor(workers):
+    global _executor, _executor_workers
+    if _executor is None or _executor_workers != workers:
+        if _executor is not None:
+            _executor.shutdown()
+        _executor = ProcessPoolExecutor(max_workers=workers)
+        _executor_workers = workers
+    return _executor
+
+
+def sample_deal(knowledge, rng, attempts=20):
+    # Random hands and envelope consistent with everything the seat knows
+    deck = knowledge.deck
+    players = knowledge.players
+    envelope_holder = knowledge.envelope
+    known = 0
+    for cards in knowledge.has:
+        known |= cards
+
+    for _ in range(attempts):
+        envelope = knowledge.has[envelope_holder]
+        taken = known
+        dealt = True
+        for category in knowledge.categories:
+            if envelope & category:
+                continue
+            candidates = deck.cards_in(category & ~knowledge.lacks[envelope_holder] & ~taken)
+            if not candidates:
+                dealt = False
+                break
+            card = rng.choice(candidates)
+            envelope |= 1 << card
+            taken |= 1 << card
+        if not dealt or envelope in knowledge.wrong_accusations:
+            continue
+
+        hands = knowledge.has[:players]
+        capacity = [knowledge.hand_sizes[seat] - count_cards(hands[seat]) for seat in range(players)]
+        cards = deck.cards_in(deck.full_mask & ~taken)
+        rng.shuffle(cards)
+        for card in cards:
+            eligible = [seat for seat in range(players)
+                        if capacity[seat] > 0 and not knowledge.lacks[seat] >> card & 1]
+            if not eligible:
+                dealt = False
+                break
+            seat = rng.choices(eligible, [capacity[seat] for seat in eligible])[0]
+            hands[seat] |= 1 << card
+            capacity[seat] -= 1
+        if not dealt:
+            continue
+
+        if all(clause & hands[seat]
+               for seat in range(players) for clause in knowledge.clauses[seat]):
+            return hands, envelope
+    return None
+
+
+def remaining_bits(knowledge):
+    possible = knowledge.possible_solution()
+    combinations = 1
+    for category in knowledge.categories:
+        combinations *= max(count_cards(possible & category), 1)
+    return math.log2(combinations)
+
+
+def top_suggestions(knowledge, seat, room_card, limit):
+    scores = sorted(score_suggestions(knowledge, seat, room_card), reverse=True)
+    return [(character_card, weapon_card) for _, character_card, weapon_card in scores[:limit]]
+
+
+class Rollout:
+
+    def __init__(self, job, knowledge, hands, rng):
+        self.board = job["board"]
+        self.main_rooms = job["main_rooms"]
+        self.seat = job["seat"]
+        self.deck = knowledge.deck
+        self.knowledge = knowledge
+        self.hands = hands
+        self.rng = rng
+        self.position = job["position"]
+        self.moves = job["moves"]
+        self.turns = 0
+
+    def suggest(self, character_card, weapon_card):
+        deck = self.deck
+        cards = (1 << character_card) | (1 << weapon_card) | (1 << deck.room_card(self.position))
+        players = len(self.hands)
+        passed = []
+        for offset in range(1, players):
+            refuter = (self.seat + offset) % players
+            held = self.hands[refuter] & cards
+            if held:
+                shown = self.rng.choice(deck.cards_in(held))
+                self.knowledge.observe_suggestion(self.seat, cards, refuter, passed, shown)
+                return
+            passed.append(refuter)
+        self.knowledge.observe_suggestion(self.seat, cards, None, passed)
+
+    def default_suggestion(self):
+        deck = self.deck
+        possible = self.knowledge.possible_solution()
+        characters = deck.cards_in(possible & deck.character_mask) or deck.cards_in(deck.character_mask)
+        weapons = deck.cards_in(possible & deck.weapon_mask) or deck.cards_in(deck.weapon_mask)
+        return self.rng.choice(characters), self.rng.choice(weapons)
+
+    def take_turn(self, target, suggestion=None):
+        # One turn walking towards target; True once target is reached
+        self.turns += 1
+        moves = self.moves or self.rng.randint(1, 6)
+        self.moves = 0
+        start = self.position
+        for room in self.board.path(start, target) or ():
+            if self.board.distance(start, room) > moves:
+                break
+            self.position = room
+            if self.board.is_main(room):
+                if room == target and suggestion is not None:
+                    self.suggest(*suggestion)
+                else:
+                    self.suggest(*self.default_suggestion())
+                return room == target
+        return False
+
+    def travel(self, target, suggestion, horizon):
+        while self.turns < horizon and not self.solved():
+            if self.take_turn(target, suggestion):
+                return
+
+    def play_out(self, horizon):
+        while self.turns < horizon and not self.solved():
+            choices = [room for room in self.main_rooms if room != self.position]
+            self.travel(self.rng.choice(choices), None, horizon)
+
+    def solved(self):
+        return self.knowledge.solution() is not None
+
+    def reward(self, start_bits, horizon):
+        if self.solved():
+            return 1.0 - 0.5 * self.turns / (horizon + 1)
+        if not start_bits:
+            return 0.0
+        return 0.5 * (start_bits - remaining_bits(self.knowledge)) / start_bits
+
+
+class Node:
+
+    def __init__(self, actions=None):
+        self.actions = actions
+        self.children = {}
+        self.visits = 0
+        self.value = 0.0
+
+    def select(self, rng):
+        untried = [action for action in self.actions if action not in self.children]
+        if untried:
+            action = rng.choice(untried)
+            self.children[action] = Node()
+            return action
+        log_visits = math.log(self.visits)
+        return max(self.actions, key=lambda action: self.children[action].ucb(log_visits))
+
+    def ucb(self, log_visits):
+        return self.value / self.visits + EXPLORATION * math.sqrt(log_visits / self.visits)
+
+    def update(self, reward):
+        self.visits += 1
+        self.value += reward
+
+
+def search(job):
+    rng = random.Random(job["seed"])
+    deadline = time.perf_counter() + job["budget"]
+    limit = job["iterations"]
+    knowledge = job["knowledge"]
+    deck = knowledge.deck
+    horizon = job["horizon"]
+    start_bits = remaining_bits(knowledge)
+    root = Node(job["actions"])
+
+    iterations = 0
+    while True:
+        if limit:
+            if iterations >= limit:
+                break
+        elif iterations and time.perf_counter() >= deadline:
+            break
+        iterations += 1
+        deal = sample_deal(knowledge, rng)
+        if deal is None:
+            continue
+        rollout = Rollout(job, knowledge.copy(), deal[0], rng)
+
+        action = root.select(rng)
+        nodes = [root, root.children[action]]
+        if job["mode"] == "room":
+            child = nodes[1]
+            if child.actions is None:
+                child.actions = top_suggestions(knowledge, job["seat"], deck.room_card(action),
+                                                job["top_suggestions"])
+            suggestion = child.select(rng)
+            nodes.append(child.children[suggestion])
+            rollout.travel(action, suggestion, horizon)
+        else:
+            rollout.turns = 1
+            rollout.suggest(*action)
+
+        rollout.play_out(horizon)
+        reward = rollout.reward(start_bits, horizon)
+        for node in nodes:
+            node.update(reward)
+
+    return {
+        "iterations": iterations,
+        "stats": {action: (child.visits, child.value) for action, child in root.children.items()},
+    }
+
+
+class MCTSBot:
+
+    def __init__(self, game, seat, knowledge=None, time_budget=TIME_BUDGET, workers=None,
+                 horizon=HORIZON, top_suggestions=TOP_SUGGESTIONS, rng=None, iterations=None):
+        self.seat = seat
+        self.knowledge = knowledge if knowledge is not None else Knowledge.for_game(game, seat)
+        self.time_budget = time_budget
+        # A seeded bot counts rollouts instead of watching the clock, so it replays
+        # the same way; iterations=0 keeps the time budget anyway
+        if iterations is None:
+            iterations = ITERATIONS if rng is not None else 0
+        self.iterations = iterations
+        self.workers = workers or os.cpu_count() or 1
+        self.horizon = horizon
+        self.top_suggestions = top_suggestions
+        self.rng = rng if rng is not None else random.Random()
+        self.last_iterations = 0
+
+    def _job(self, game, player, mode, actions):
+        board = game.mansion.board
+        return {
+            "mode": mode,
+            "actions": actions,
+            "knowledge": self.knowledge,
+            "board": board,
+            "main_rooms": [room for room in range(board.size) if board.is_main(room)],
+            "seat": self.seat,
+            "position": game.mansion.room_index(player.position),
+            "moves": game.remain_moves,
+            "horizon": self.horizon,
+            "top_suggestions": self.top_suggestions,
+            "budget": self.time_budget,
+            "iterations": -(-self.iterations // self.workers),
+        }
+
+    def _search(self, job):
+        jobs = [dict(job, seed=self.rng.getrandbits(64)) for _ in range(self.workers)]
+        if self.workers == 1:
+            results = [search(jobs[0])]
+        else:
+            results = list(get_executor(self.workers).map(search, jobs))
+
+        visits = {}
+        for result in results:
+            for action, (action_visits, _) in result["stats"].items():
+                visits[action] = visits.get(action, 0) + action_visits
+        self.last_iterations = sum(result["iterations"] for result in results)
+        if not visits:
+            return None
+        return max(visits, key=visits.get)
+
+    def choose_room(self, game, player):
+        mansion = game.mansion
+        board = mansion.board
+        position = mansion.room_index(player.position)
+        rooms = [room for room in range(board.size) if board.is_main(room) and room != position]
+        room = self._search(self._job(game, player, "room", rooms))
+        if room is None:
+            room = self.rng.choice(rooms)
+        return mansion.rooms[room]
+
+    def choose_suggestion(self, game, player):
+        deck = game.mansion.deck
+        room_card = game.mansion.entity_cards[player.position]
+        suggestions = top_suggestions(self.knowledge, self.seat, room_card, self.top_suggestions)
+        if len(suggestions) > 1:
+            choice = self._search(self._job(game, player, "suggestion", suggestions))
+        else:
+            choice = None
+        character_card, weapon_card = choice or suggestions[0]
+        return deck.names[character_card], deck.names[weapon_card]
+
+    def step_towards(self, game, player, target):
+        mansion = game.mansion
+        stop = None
+        for room in mansion.shortest_path(player.position, target) or ():
+            if mansion.distance(player.position, room) > game.remain_moves:
+                break
+            stop = room
+        if stop is None:
+            return False, f"{player.name} cannot move towards {target.name}.", False
+        return game.go_to_room(player, stop.name)
+
+    def play_turn(self, game):
+        player = game.players[self.seat]
+        deck = game.mansion.deck
+        messages = []
+
+        solution = self.knowledge.solution()
+        if solution is not None:
+            success, message = game.make_accusation(player, *deck.card_names(solution))
+            messages.append(message)
+            if not game.game_over:
+                game.next_turn()
+            return messages
+
+        dice_roll = game.start_turn()
+        messages.append(f"{player.name} rolled a {dice_roll}.")
+        target = self.choose_room(game, player)
+
+        while game.remain_moves > 0:
+            success, message, requires_suggestion = self.step_towards(game, player, target)
+            if not success:
+                break
+            messages.append(f"{player.name} moved to {player.position.name}.")
+            if requires_suggestion:
+                character_name, weapon_name = self.choose_suggestion(game, player)
+                game.make_suggestion(player, character_name, weapon_name)
+                messages.append(self._describe_suggestion(game, player, character_name, weapon_name))
+                break
+
+        game.next_turn()
+        return messages
+
+    def _describe_suggestion(self, game, player, character_name, weapon_name):
+        message = (f"{player.name} suggested {character_name} with the {weapon_name} "
+                   f"in the {player.position.name}.")
+        refuter = game.last_suggestion["refuter"]
+        if refuter is None:
+            return message + " Nobody could refute it."
+        return message + f" {game.players[refuter].name} showed them a card."
+
+
+def add_bots(game, seats, rng=None, **options):
+    # With rng, each bot is seeded from it and plays reproducibly
+    bots = []
+    for seat in seats:
+        bot_rng = random.Random(rng.getrandbits(64)) if rng is not None else None
+        bot = MCTSBot(game, seat, rng=bot_rng, **options)
+        game.players[seat].bot = bot
+        bots.append(bot)
+    game.sink = FanoutSink(game.sink, *(bot.knowledge for bot in bots))
+    return bots
@@ -0,0 +1,81 @@
+from registry import get_registry
+
+_default_deck = None
+
+
+class Deck:
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.names = (registry.characters + registry.weapons +
+                      [registry.rooms[room_id] for room_id in registry.main_rooms])
+        self.size = len(self.names)
+
+        first_weapon = len(registry.characters)
+        first_room = first_weapon + len(registry.weapons)
+        self.room_cards = {room_id: first_room + i
+                           for i, room_id in enumerate(registry.main_rooms)}
+        self.card_rooms = {card: room_id for room_id, card in self.room_cards.items()}
+        self.first_weapon = first_weapon
+        self.first_room = first_room
+
+        self.character_mask = (1 << first_weapon) - 1
+        self.weapon_mask = ((1 << first_room) - 1) ^ self.character_mask
+        self.room_mask = ((1 << self.size) - 1) ^ self.character_mask ^ self.weapon_mask
+        self.full_mask = (1 << self.size) - 1
+
+    def character_card(self, character_id):
+        return character_id
+
+    def weapon_card(self, weapon_id):
+        return self.first_weapon + weapon_id
+
+    def room_card(self, room_id):
+        return self.room_cards.get(room_id)
+
+    def triple_mask(self, character_id, weapon_id, room_id):
+        return ((1 << self.character_card(character_id)) |
+                (1 << self.weapon_card(weapon_id)) |
+                (1 << self.room_card(room_id)))
+
+    def card_of(self, name):
+        character_id = self.registry.character_id(name)
+        if character_id is not None:
+            return self.character_card(character_id)
+        weapon_id = self.registry.weapon_id(name)
+        if weapon_id is not None:
+            return self.weapon_card(weapon_id)
+        room_id = self.registry.room_id(name)
+        if room_id is not None:
+            return self.room_card(room_id)
+        return None
+
+    def mask_of(self, names):
+        mask = 0
+        for name in names:
+            card = self.card_of(name)
+            if card is not None:
+                mask |= 1 << card
+        return mask
+
+    def cards_in(self, mask):
+        cards = []
+        while mask:
+            low_bit = mask & -mask
+            cards.append(low_bit.bit_length() - 1)
+            mask ^= low_bit
+        return cards
+
+    def card_names(self, mask):
+        return [self.names[card] for card in self.cards_in(mask)]
+
+
+def count_cards(mask):
+    return bin(mask).count("1")
+
+
+def get_deck():
+    global _default_deck
+    if _default_deck is None:
+        _default_deck = Deck(get_registry())
+    return _default_deck
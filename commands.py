@@ -0,0 +1,233 @@
+from itertools import combinations
+from registry import get_registry
+
+# Argument slots each command takes, in order
+VERBS = {
+    "move": ("room",),
+    "go": ("room",),
+    "suggest": ("character", "weapon"),
+    "accuse": ("character", "weapon", "room"),
+    "status": (),
+    "map": (),
+    "help": (),
+    "end": (),
+    "quit": (),
+}
+
+USAGE = {
+    "move": "move [room]",
+    "go": "go [room]",
+    "suggest": "suggest 'Miss Scarlett' Revolver",
+    "accuse": "accuse 'Miss Scarlett' Revolver Kitchen",
+}
+
+SIMILAR_CACHE = 4096
+
+_grammars = {}
+
+
+def tokenize(text):
+    words = text.replace('"', " ").casefold().split()
+    if "'" not in text:
+        return words
+    return [word for word in (word.strip("'") for word in words) if word]
+
+
+def max_typos(token):
+    # Short words and numbers must match exactly: "ball" is not "hall", room 12 is not room 13
+    if len(token) < 5 or any(c.isdigit() for c in token):
+        return 0
+    return 1 if len(token) < 8 else 2
+
+
+def deletions(token, depth):
+    variants = {token}
+    for n in range(1, min(depth, len(token) - 1) + 1):
+        for positions in combinations(range(len(token)), n):
+            variants.add("".join(c for i, c in enumerate(token) if i not in positions))
+    return variants
+
+
+def edit_distance(a, b, limit):
+    # Optimal string alignment distance, or limit + 1 once it is certainly larger
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class Command:
+    __slots__ = ("verb", "character", "weapon", "room", "typos")
+
+    def __init__(self, verb, character=None, weapon=None, room=None, typos=0):
+        self.verb = verb
+        self.character = character
+        self.weapon = weapon
+        self.room = room
+        self.typos = typos
+
+    def __repr__(self):
+        return (f"Command({self.verb!r}, character={self.character}, "
+                f"weapon={self.weapon}, room={self.room})")
+
+
+class Grammar:
+    # One token trie per entity kind over every name and alias, plus an index
+    # of each word with letters deleted so a typo is found by lookup rather
+    # than by comparing against every word on the board
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.tries = {
+            "character": self._build_trie(registry.character_ids),
+            "weapon": self._build_trie(registry.weapon_ids),
+            "room": self._build_trie(registry.room_ids),
+        }
+        self.verbs = {verb: {} for verb in VERBS}
+        self.typos = {}
+        self._similar_cache = {}
+        for word in set(self.verbs) | self._words():
+            for variant in deletions(word, max_typos(word)):
+                self.typos.setdefault(variant, set()).add(word)
+
+    def _build_trie(self, lookup):
+        # Nodes are dicts of word -> child; the None key holds the entity id
+        root = {}
+        for name, entity_id in lookup.items():
+            node = root
+            for token in tokenize(name):
+                node = node.setdefault(token, {})
+            node[None] = entity_id
+        return root
+
+    def _words(self):
+        words = set()
+        stack = list(self.tries.values())
+        while stack:
+            node = stack.pop()
+            for token, child in node.items():
+                if token is not None:
+                    words.add(token)
+                    stack.append(child)
+        return words
+
+    def _similar(self, token):
+        # {word: typos} for every known word within the typo limit of token
+        similar = self._similar_cache.get(token)
+        if similar is None:
+            similar = {}
+            limit = max_typos(token)
+            if limit:
+                candidates = set()
+                for variant in deletions(token, limit):
+                    candidates |= self.typos.get(variant, set())
+                for word in candidates:
+                    if max_typos(word):
+                        distance = edit_distance(token, word, limit)
+                        if distance <= limit:
+                            similar[word] = distance
+            if len(self._similar_cache) >= SIMILAR_CACHE:
+                self._similar_cache.clear()
+            self._similar_cache[token] = similar
+        return similar
+
+    def _step(self, node, token):
+        # (word, typos) for the word under node that token stands for
+        if token in node:
+            return token, 0
+        if len(node) == (None in node):
+            return None, 0
+        best = None
+        ambiguous = False
+        for word, distance in self._similar(token).items():
+            if word not in node:
+                continue
+            if best is None or distance < best[1]:
+                best = (word, distance)
+                ambiguous = False
+            elif distance == best[1]:
+                ambiguous = True
+        if best is None or ambiguous:
+            return None, 0
+        return best
+
+    def _matches(self, kind, tokens, start):
+        # Every (end, entity id, typos) whose name spans tokens[start:end]
+        node = self.tries[kind]
+        typos = 0
+        matches = []
+        for end in range(start, len(tokens)):
+            token = tokens[end]
+            if token in node:
+                node = node[token]
+            else:
+                word, cost = self._step(node, token)
+                if word is None:
+                    break
+                node = node[word]
+                typos += cost
+            if None in node:
+                matches.append((end + 1, node[None], typos))
+        return matches
+
+    def _fill(self, slots, tokens, start):
+        # Longest names first; every token must be used
+        if not slots:
+            return ([], 0) if start == len(tokens) else None
+        for end, entity_id, typos in reversed(self._matches(slots[0], tokens, start)):
+            rest = self._fill(slots[1:], tokens, end)
+            if rest is not None:
+                return [entity_id] + rest[0], typos + rest[1]
+        return None
+
+    def parse_args(self, verb, tokens):
+        slots = VERBS[verb]
+        if not slots:
+            return (Command(verb), None) if not tokens else (None, f"'{verb}' takes no arguments")
+        filled = self._fill(slots, tokens, 0)
+        if filled is None:
+            return None, f"Could not understand '{' '.join(tokens)}'. Use: {USAGE[verb]}"
+        ids, typos = filled
+        return Command(verb, typos=typos, **dict(zip(slots, ids))), None
+
+    def parse(self, text, verb=None):
+        # (Command, None) on success, (None, message) otherwise; with verb
+        # given, text holds only that command's arguments
+        tokens = tokenize(text)
+        if verb is None:
+            if not tokens:
+                return None, "Type a command"
+            verb, _ = self._step(self.verbs, tokens[0])
+            if verb is None:
+                return None, "Invalid command. Type 'help' for available commands."
+            tokens = tokens[1:]
+        return self.parse_args(verb, tokens)
+
+    def names(self, command):
+        # Canonical names for the ids a command carries
+        registry = self.registry
+        return {
+            "character": registry.characters[command.character] if command.character is not None else None,
+            "weapon": registry.weapons[command.weapon] if command.weapon is not None else None,
+            "room": registry.rooms[command.room] if command.room is not None else None,
+        }
+
+
+def get_grammar(registry=None):
+    registry = registry or get_registry()
+    grammar = _grammars.get(id(registry))
+    if grammar is None or grammar.registry is not registry:
+        grammar = _grammars[id(registry)] = Grammar(registry)
+    return grammar
@@ -0,0 +1,48 @@
+class ConsoleSink:
+
+    def __init__(self, write=print):
+        self.write = write
+        self.formatters = {
+            "cards_dealt": self._format_cards_dealt,
+            "game_created": self._format_game_created,
+        }
+
+    def __call__(self, event, data):
+        formatter = self.formatters.get(event)
+        if formatter:
+            self.write(formatter(data))
+
+    def _format_cards_dealt(self, data):
+        cards = data["cards"]
+        return f"{data['player']} received {len(cards)} cards: {', '.join(cards)}"
+
+    def _format_game_created(self, data):
+        return f"\nThis game has {data['players']} players\nCards distributed sucessfully"
+
+
+class ListSink:
+
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event, data):
+        self.events.append((event, data))
+
+    def of_type(self, event):
+        return [data for name, data in self.events if name == event]
+
+    def clear(self):
+        self.events.clear()
+
+
+class FanoutSink:
+
+    def __init__(self, *sinks):
+        self.sinks = [sink for sink in sinks if sink]
+
+    def __call__(self, event, data):
+        for sink in self.sinks:
+            sink(event, data)
+
+
+CONSOLE = ConsoleSink()
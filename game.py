@@ -1,67 +1,140 @@
 import random
 from mansion import Mansion
+from events import CONSOLE
+from scoring import score_suggestions
+from snapshot import MAX_PLAYERS, pack_state, unpack_state
 
 
 class Player:
+    __slots__ = ("name", "character", "mansion", "deck", "seat", "hand",
+                 "must_suggest", "eliminated", "bot")
     
-    def __init__(self, name, character):
+    def __init__(self, name, character, mansion, seat=0):
         self.name = name
         self.character = character
-        self.position = character.current_room
-        self.cards = []
+        self.mansion = mansion
+        self.deck = mansion.deck
+        self.seat = seat
+        self.hand = 0
         self.must_suggest = False 
+        self.eliminated = False
+        self.bot = None
+    
+    def copy(self, mansion):
+        player = Player.__new__(Player)
+        player.name = self.name
+        player.character = self.character
+        player.mansion = mansion
+        player.deck = self.deck
+        player.seat = self.seat
+        player.hand = self.hand
+        player.must_suggest = self.must_suggest
+        player.eliminated = self.eliminated
+        player.bot = None
+        return player
+    
+    @property
+    def position(self):
+        return self.mansion.rooms[self.mansion.player_positions[self.seat]]
+    
+    @position.setter
+    def position(self, room):
+        self.mansion.player_positions[self.seat] = self.mansion.room_index(room)
     
     @property
     def current_room(self):
         return self.position
+    
+    @property
+    def cards(self):
+        return self.deck.card_names(self.hand)
+    
+    def has_card(self, card):
+        return bool(self.hand >> card & 1)
 
 
 class Game:
     
-    def __init__(self, gamePlayers):
-        self.mansion = Mansion()
+    def __init__(self, gamePlayers, sink=CONSOLE, rng=None, template=None):
+        self.sink = sink
+        self.rng = rng if rng is not None else random
+        self.mansion = Mansion(self.rng, template)
         self.players = []
         self.current_player_index = 0
         self.game_over = False
+        self.winner = None
         self.turn_count = 0
         self.remain_moves = 0
+        self.card_holders = []
+        self.last_suggestion = None
         
-        if gamePlayers < 3 or gamePlayers > 6:
-            raise ValueError("Players must be between 3 and 6")
+        # Snapshots have room for MAX_PLAYERS seats
+        max_players = min(MAX_PLAYERS, len(self.mansion.characters))
+        if gamePlayers < 3 or gamePlayers > max_players:
+            raise ValueError(f"Players must be between 3 and {max_players}")
         self._create_players(gamePlayers)
         self._distribute_cards()
         
-        print(f"\nThis game has {gamePlayers} players")
-        print("Cards distributed sucessfully")
+        if self.sink:
+            self.sink("game_created", {"players": gamePlayers})
+    
+    def snapshot(self):
+        return pack_state(self)
+    
+    @classmethod
+    def restore(cls, data, sink=CONSOLE, rng=None):
+        state = unpack_state(data)
+        game = cls.__new__(cls)
+        game.sink = sink
+        game.rng = rng if rng is not None else random
+        game.mansion = Mansion.restore(state["solution"], state["character_positions"],
+                                       state["weapon_positions"], state["player_positions"], game.rng)
+        game.current_player_index = state["current_player_index"]
+        game.game_over = state["game_over"]
+        game.winner = state["winner"]
+        game.turn_count = state["turn_count"]
+        game.remain_moves = state["remain_moves"]
+        game.last_suggestion = state["last_suggestion"]
+        game.players = []
+        game._create_players(state["players"])
+        game.card_holders = [None] * game.mansion.deck.size
+        for player, hand in zip(game.players, state["hands"]):
+            player.hand = hand
+            player.must_suggest = state["must_suggest"][player.seat]
+            player.eliminated = state["eliminated"][player.seat]
+            for card in game.mansion.deck.cards_in(hand):
+                game.card_holders[card] = player.seat
+        return game
+    
+    def clone(self, sink=None, rng=None):
+        # Same state without a byte round trip; bots are not copied.
+        # card_holders and last_suggestion are replaced, never changed, so they are shared
+        game = Game.__new__(Game)
+        state = self.__dict__.copy()
+        state["sink"] = sink
+        state["rng"] = rng if rng is not None else self.rng
+        mansion = state["mansion"] = self.mansion.copy(state["rng"])
+        players = state["players"] = []
+        for player in self.players:
+            players.append(player.copy(mansion))
+        game.__dict__ = state
+        return game
     
     def _create_players(self, gamePlayers):
         available_characters = self.mansion.characters[:gamePlayers]
         
         for i in range(gamePlayers):
             player_name = f"Player {i+1}"
-            player = Player(player_name, available_characters[i])
+            player = Player(player_name, available_characters[i], self.mansion, i)
             self.players.append(player)
     
     def _distribute_cards(self):
-        all_cards = []
-        solution_char = self.mansion.solution['character'].name
-        for char in self.mansion.characters:
-            if char.name != solution_char:
-                all_cards.append(char.name)
-        
-        solution_weapon = self.mansion.solution['weapon'].name
-        for weapon in self.mansion.weapons:
-            if weapon.name != solution_weapon:
-                all_cards.append(weapon.name)
-    
-        solution_room = self.mansion.solution['room'].name
-        room_names = ["Kitchen", "Ballroom", "Conservatory", "Dining Room", 
-                     "Billiard Room", "Library", "Lounge", "Hall", "Study"]
-        for room_name in room_names:
-            if room_name != solution_room:
-                all_cards.append(room_name)
-        
-        random.shuffle(all_cards)
+        deck = self.mansion.deck
+        solution = self.mansion.solution_mask
+        all_cards = [card for card in range(deck.size) if not solution >> card & 1]
+        self.card_holders = [None] * deck.size
+        
+        self.rng.shuffle(all_cards)
         
         gamePlayers = len(self.players)
         cards_per_player = len(all_cards) // gamePlayers
@@ -70,30 +143,47 @@ class Game:
         card_index = 0
         for i, player in enumerate(self.players):
             num_cards = cards_per_player + (1 if i < extra_cards else 0)
-            player.cards = all_cards[card_index:card_index + num_cards]
+            hand = 0
+            for card in all_cards[card_index:card_index + num_cards]:
+                hand |= 1 << card
+                self.card_holders[card] = i
+            player.hand = hand
             card_index += num_cards
             
-            print(f"{player.name} received {len(player.cards)} cards: {', '.join(player.cards)}")
+            if self.sink:
+                self.sink("cards_dealt", {
+                    "player": player.name,
+                    "seat": i,
+                    "hand": hand,
+                    "cards": player.cards,
+                })
     
     def roll_dice(self):
-        return random.randint(1, 6)
+        return self.rng.randint(1, 6)
     
     def start_turn(self):
         dice_roll = self.roll_dice()
         self.remain_moves = dice_roll
+        if self.sink:
+            self.sink("dice_rolled", {"player": self.get_current_player().name, "roll": dice_roll})
         return dice_roll
     
     def get_current_player(self):
         return self.players[self.current_player_index]
     
     def next_turn(self):
-        self.current_player_index = (self.current_player_index + 1) % len(self.players)
+        for _ in range(len(self.players)):
+            self.current_player_index = (self.current_player_index + 1) % len(self.players)
+            if not self.players[self.current_player_index].eliminated:
+                break
         self.turn_count += 1
         self.remain_moves = 0
         
         # Reset suggestion flag for new player
         current_player = self.get_current_player()
         current_player.must_suggest = False
+        if self.sink:
+            self.sink("turn_started", {"player": current_player.name, "turn": self.turn_count})
     
     def move_player(self, player, target_room_name):
         if self.remain_moves <= 0:
@@ -106,33 +196,104 @@ class Game:
             return False, f"Room '{target_room_name}' not found.", False
         
         if not self.mansion.is_valid_move(current_room, target_room):
-            return False, f"Cannot move to {target_room_name} from {current_room.name}.", False
+            return False, f"Cannot move to {target_room.name} from {current_room.name}.", False
         
         player.position = target_room
         
         used_secret_passage = False
-        if (current_room.secret_passage and 
-            current_room.secret_passage.name == target_room_name):
-            message = f"Used secret passage to {target_room_name}!"
+        if current_room.secret_passage == target_room:
+            message = f"Used secret passage to {target_room.name}!"
             used_secret_passage = True
         else:
             self.remain_moves -= 1
-            message = f"Moved to {target_room_name}. Moves remaining: {self.remain_moves}"
+            message = f"Moved to {target_room.name}. Moves remaining: {self.remain_moves}"
         
         requires_suggestion = False
         if self.mansion.is_main_room(target_room): 
             player.must_suggest = True
             requires_suggestion = True
-            message += f"\nYou entered {target_room_name}! Now first make a suggestion."
+            message += f"\nYou entered {target_room.name}! Now first make a suggestion."
+        
+        if self.sink:
+            self.sink("player_moved", {
+                "player": player.name,
+                "from": current_room.name,
+                "to": target_room.name,
+                "secret_passage": used_secret_passage,
+                "remain_moves": self.remain_moves,
+            })
+        
+        return True, message, requires_suggestion
+    
+    def go_to_room(self, player, target_room_name):
+        if self.remain_moves <= 0:
+            return False, "your turn is over", False
+        
+        current_room = player.position
+        target_room = self.mansion.get_room_name(target_room_name)
+        
+        if not target_room:
+            return False, f"Room '{target_room_name}' not found.", False
+        
+        if target_room == current_room:
+            return False, f"You are already in {current_room.name}.", False
+        
+        path = self.mansion.shortest_path(current_room, target_room)
+        if path is None:
+            return False, f"Cannot reach {target_room.name} from {current_room.name}.", False
+        
+        cost = self.mansion.distance(current_room, target_room)
+        if cost > self.remain_moves:
+            return False, (f"{target_room.name} is {cost} moves away, "
+                           f"you only have {self.remain_moves}."), False
+        
+        # Walk the path up to the first main room, where a suggestion is due
+        stop_room = current_room
+        for room in path:
+            stop_room = room
+            if self.mansion.is_main_room(room):
+                break
+        
+        used_moves = self.mansion.distance(current_room, stop_room)
+        player.position = stop_room
+        self.remain_moves -= used_moves
+        
+        route = path[:path.index(stop_room) + 1]
+        secret_passages = sum(1 for previous, room in zip([current_room] + route, route)
+                              if previous.secret_passage == room)
+        message = f"Moved to {stop_room.name} via {' -> '.join(r.name for r in route)}. "
+        message += f"Moves remaining: {self.remain_moves}"
+        
+        requires_suggestion = False
+        if self.mansion.is_main_room(stop_room):
+            player.must_suggest = True
+            requires_suggestion = True
+            message += f"\nYou entered {stop_room.name}! Now first make a suggestion."
+            if stop_room != target_room:
+                message += f"\nAfter your suggestion, continue to {target_room.name}."
+        
+        if self.sink:
+            self.sink("player_travelled", {
+                "player": player.name,
+                "from": current_room.name,
+                "to": stop_room.name,
+                "path": [r.name for r in route],
+                "secret_passages": secret_passages,
+                "remain_moves": self.remain_moves,
+            })
         
         return True, message, requires_suggestion
     
-    def make_suggestion(self, player, character_name, weapon_name):
+    def make_suggestion(self, player, character_name, weapon_name, shown_card=None):
         current_room = player.position
         
         if not self.mansion.is_main_room(current_room):
             return False, "\make suggestions in main rooms, not hallways."
     
+        # One suggestion per room entry; refutations are not free information
+        if not player.must_suggest:
+            return False, "You can only make one suggestion each time you enter a room."
+    
         character = self.mansion.get_character_name(character_name)
         if not character:
             available_chars = [c.name for c in self.mansion.characters]
@@ -144,7 +305,7 @@ class Game:
             return False, f"Weapon '{weapon_name}' not found. Available: {', '.join(available_weapons)}"
     
         character_moved = False
-        if character.current_room != current_room:
+        if self.mansion.character_room(character) != current_room:
             self.mansion.character_in_room(character, current_room)
             character_moved = True
             char_move_msg = f"Moved {character.name} to {current_room.name}. "
@@ -152,10 +313,8 @@ class Game:
             char_move_msg = f"{character.name} is already here. "
     
         weapon_moved = False
-        if weapon.current_room != current_room:
-            if weapon.current_room:
-                weapon.current_room.remove_weapon(weapon)
-            current_room.add_weapon(weapon)
+        if self.mansion.weapon_room(weapon) != current_room:
+            self.mansion.weapon_in_room(weapon, current_room)
             weapon_moved = True
             weapon_move_msg = f"Moved {weapon.name} to {current_room.name}."
         else:
@@ -163,8 +322,118 @@ class Game:
         
         player.must_suggest = False
         
+        suggested_cards = self.mansion.suggestion_mask(character, weapon, current_room)
+        refuter, shown_card, passed = self.refute(player.seat, suggested_cards, shown_card)
+        self.last_suggestion = {
+            "seat": player.seat,
+            "cards": suggested_cards,
+            "refuter": refuter,
+            "shown": shown_card,
+            "passed": passed,
+        }
+        
+        if self.sink:
+            self.sink("suggestion_made", {
+                "player": player.name,
+                "seat": player.seat,
+                "character": character.name,
+                "weapon": weapon.name,
+                "room": current_room.name,
+                "cards": suggested_cards,
+                "character_moved": character_moved,
+                "weapon_moved": weapon_moved,
+                "refuter": refuter,
+                "shown": shown_card,
+                "passed": passed,
+            })
+        
         message = f"SUGGESTION: {character.name} with {weapon.name} in {current_room.name}\n"
         message += f"RESULT: {char_move_msg}{weapon_move_msg}"
+        if refuter is None:
+            message += "\nNobody could refute this suggestion."
+        else:
+            card_name = self.mansion.deck.names[shown_card]
+            message += f"\nREFUTED: {self.players[refuter].name} showed you {card_name}."
+        
+        return True, message
+    
+    def evaluate_suggestions(self, player, knowledge, envelope_probabilities=None):
+        current_room = player.position
+        if not self.mansion.is_main_room(current_room):
+            return []
+        
+        deck = self.mansion.deck
+        room_card = self.mansion.entity_cards[current_room]
+        scores = score_suggestions(knowledge, player.seat, room_card, envelope_probabilities)
+        return [(deck.names[character_card], deck.names[weapon_card], gain)
+                for gain, character_card, weapon_card in scores]
+    
+    def refute(self, seat, cards, shown_card=None):
+        # Whoever holds one of the cards closest clockwise from the suggester refutes;
+        # shown_card replays a card that was already chosen
+        players_count = len(self.players)
+        refuter = None
+        best_offset = players_count
+        remaining = cards
+        while remaining:
+            low_bit = remaining & -remaining
+            remaining ^= low_bit
+            holder = self.card_holders[low_bit.bit_length() - 1]
+            if holder is None or holder == seat:
+                continue
+            offset = (holder - seat) % players_count
+            if offset < best_offset:
+                best_offset = offset
+                refuter = holder
+        
+        passed = [(seat + offset) % players_count for offset in range(1, best_offset)]
+        if refuter is None:
+            return None, None, passed
+        
+        matching = self.mansion.deck.cards_in(self.players[refuter].hand & cards)
+        if shown_card not in matching:
+            shown_card = matching[0] if len(matching) == 1 else self.rng.choice(matching)
+        return refuter, shown_card, passed
+    
+    def make_accusation(self, player, character_name, weapon_name, room_name):
+        if self.game_over:
+            return False, "The game is already over."
+        if player.eliminated:
+            return False, f"{player.name} has already made a wrong accusation."
+        
+        character = self.mansion.get_character_name(character_name)
+        if not character:
+            return False, f"Character '{character_name}' not found."
+        weapon = self.mansion.get_weapon_name(weapon_name)
+        if not weapon:
+            return False, f"Weapon '{weapon_name}' not found."
+        room = self.mansion.get_room_name(room_name)
+        if not room or not self.mansion.is_main_room(room):
+            return False, f"Room '{room_name}' not found."
+        
+        accused_cards = self.mansion.suggestion_mask(character, weapon, room)
+        correct = accused_cards == self.mansion.solution_mask
+        
+        message = f"ACCUSATION: {character.name} with {weapon.name} in {room.name}\n"
+        if correct:
+            self.game_over = True
+            self.winner = player.seat
+            message += f"Correct! {player.name} solved the mystery."
+        else:
+            player.eliminated = True
+            player.must_suggest = False
+            message += f"Wrong! {player.name} is out of the game but still shows cards."
+            if all(p.eliminated for p in self.players):
+                self.game_over = True
+                message += "\nEveryone has accused wrongly, nobody wins."
+        
+        if self.sink:
+            self.sink("accusation_made", {
+                "player": player.name,
+                "seat": player.seat,
+                "cards": accused_cards,
+                "correct": correct,
+            })
         
         return True, message
     
@@ -172,28 +441,26 @@ class Game:
         available_rooms = self.mansion.next_moves(player.position)
         return [room.name for room in available_rooms]
     
-    def display_player_status(self, player):
-        status = f"\n=== {player.name} ({player.character.name}) ===\n"
-        status += f"Position: {player.position.name}\n"
-        status += f"Moves remaining: {self.remain_moves}\n"
-        
+    def display_player_status(self, player, room_info=None):
+        lines = [
+            f"\n=== {player.name} ({player.character.name}) ===",
+            f"Position: {player.position.name}",
+            f"Moves remaining: {self.remain_moves}",
+        ]
         if player.must_suggest:
-            status += "YOU MUST MAKE A SUGGESTION (entered a room)\n"
-        
-        status += f"Your cards: {', '.join(player.cards)}\n"
+            lines.append("YOU MUST MAKE A SUGGESTION (entered a room)")
+        lines.append(f"Your cards: {', '.join(player.cards)}")
         
-        # Current room info
-        status += self.mansion.display_room_info(player.position)
+        # Current room info, which the caller may have cached
+        if room_info is None:
+            room_info = self.mansion.display_room_info(player.position)
         
         # Available moves
         available_moves = self.get_available_moves(player)
-        status += f"\nAvailable moves: {', '.join(available_moves)}\n"
-        
-        return status
+        return "\n".join(lines) + "\n" + room_info + f"\nAvailable moves: {', '.join(available_moves)}\n"
     
     def display_game_state(self):
-        state = f"\n=== Game State (Turn {self.turn_count + 1}) ===\n"
-        state += f"Current player: {self.get_current_player().name}\n"
-        state += f"Total players: {len(self.players)}\n"
-        state += f"Players: {', '.join([p.name for p in self.players])}\n"
-        return state
\ No newline at end of file
+        return (f"\n=== Game State (Turn {self.turn_count + 1}) ===\n"
+                f"Current player: {self.get_current_player().name}\n"
+                f"Total players: {len(self.players)}\n"
+                f"Players: {', '.join([p.name for p in self.players])}\n")
\ No newline at end of file
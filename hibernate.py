@@ -0,0 +1,105 @@
+import mmap
+import time
+from collections import OrderedDict
+
+IDLE_TIME = 300.0
+SLAB_CAPACITY = 4096
+
+
+class Slab:
+    # Fixed-size records in a memory-mapped file that doubles when it fills up
+
+    def __init__(self, path, record_size, capacity=SLAB_CAPACITY):
+        self.record_size = record_size
+        self.file = open(path, "w+b")
+        self.capacity = 0
+        self.buffer = None
+        self.free = []
+        self._grow(capacity)
+
+    def _grow(self, capacity):
+        if self.buffer is not None:
+            self.buffer.close()
+        self.file.truncate(capacity * self.record_size)
+        self.buffer = mmap.mmap(self.file.fileno(), capacity * self.record_size)
+        self.free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+    def __len__(self):
+        return self.capacity - len(self.free)
+
+    def store(self, data):
+        if len(data) != self.record_size:
+            raise ValueError(f"Slab records are {self.record_size} bytes, got {len(data)}")
+        if not self.free:
+            self._grow(self.capacity * 2)
+        slot = self.free.pop()
+        start = slot * self.record_size
+        self.buffer[start:start + self.record_size] = data
+        return slot
+
+    def load(self, slot):
+        start = slot * self.record_size
+        return self.buffer[start:start + self.record_size]
+
+    def release(self, slot):
+        self.free.append(slot)
+
+    def close(self):
+        self.buffer.close()
+        self.file.close()
+
+
+class Hibernator:
+    # Tracks when each live key was last used and parks the rest in a slab;
+    # keys are evicted least recently used first, once idle or when more than
+    # max_live keys are live (a count of keys, not bytes)
+
+    def __init__(self, path, record, idle_time=IDLE_TIME, max_live=None, clock=time.monotonic):
+        self.record = record
+        self.slab = Slab(path, record.size)
+        self.idle_time = idle_time
+        self.max_live = max_live
+        self.clock = clock
+        self.live = OrderedDict()
+        self.slots = {}
+
+    def __contains__(self, key):
+        return key in self.slots
+
+    def touch(self, key):
+        self.live[key] = self.clock()
+        self.live.move_to_end(key)
+
+    def forget(self, key):
+        self.live.pop(key, None)
+        slot = self.slots.pop(key, None)
+        if slot is not None:
+            self.slab.release(slot)
+
+    def evictions(self):
+        # Keys to park now, least recently used first
+        now = self.clock()
+        keys = []
+        over = len(self.live) - self.max_live if self.max_live is not None else 0
+        for key, used in self.live.items():
+            if over > 0:
+                over -= 1
+            elif now - used < self.idle_time:
+                break
+            keys.append(key)
+        return keys
+
+    def store(self, key, *values):
+        self.live.pop(key, None)
+        self.slots[key] = self.slab.store(self.record.pack(*values))
+
+    def load(self, key):
+        slot = self.slots.pop(key)
+        values = self.record.unpack(self.slab.load(slot))
+        self.slab.release(slot)
+        self.touch(key)
+        return values
+
+    def close(self):
+        self.slab.close()
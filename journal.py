@@ -0,0 +1,239 @@
+import argparse
+import mmap
+import os
+import struct
+import time
+from collections import Counter
+from cards import get_deck
+from events import FanoutSink
+from game import Game
+from snapshot import SNAPSHOT, NONE
+
+# One record per state change: a kind byte followed by a fixed payload.
+# A journal starts with the game's snapshot, so journals can be concatenated
+# into an archive and every SNAPSHOT record marks the start of a new game
+SNAPSHOT_RECORD = ord("S")
+ROLL = ord("R")
+MOVE = ord("M")
+TRAVEL = ord("G")
+SUGGESTION = ord("C")
+ACCUSATION = ord("A")
+NEXT_TURN = ord("N")
+
+RECORDS = {
+    SNAPSHOT_RECORD: struct.Struct(f"<{SNAPSHOT.size}s"),
+    ROLL: struct.Struct("<2B"),            # seat, roll
+    MOVE: struct.Struct("<2B"),            # seat, room
+    TRAVEL: struct.Struct("<2B"),          # seat, room
+    SUGGESTION: struct.Struct("<BIB"),     # seat, cards, shown
+    ACCUSATION: struct.Struct("<BI"),      # seat, cards
+    NEXT_TURN: struct.Struct("<"),
+}
+
+
+class JournalWriter:
+
+    def __init__(self, game, file, flush=True, header=True):
+        self.game = game
+        self.file = file
+        self.flush = flush
+        self.seats = {player.name: player.seat for player in game.players}
+        self.records = 0
+        if header:
+            self.write(SNAPSHOT_RECORD, game.snapshot())
+        game.sink = FanoutSink(game.sink, self)
+
+    def write(self, kind, *values):
+        self.file.write(bytes((kind,)) + RECORDS[kind].pack(*values))
+        self.records += 1
+        if self.flush:
+            self.file.flush()
+
+    def __call__(self, event, data):
+        mansion = self.game.mansion
+        if event == "dice_rolled":
+            self.write(ROLL, self.game.current_player_index, data["roll"])
+        elif event == "player_moved":
+            room = mansion.get_room_name(data["to"])
+            self.write(MOVE, self.seats[data["player"]], mansion.room_index(room))
+        elif event == "player_travelled":
+            room = mansion.get_room_name(data["to"])
+            self.write(TRAVEL, self.seats[data["player"]], mansion.room_index(room))
+        elif event == "suggestion_made":
+            shown = data["shown"]
+            self.write(SUGGESTION, data["seat"], data["cards"], NONE if shown is None else shown)
+        elif event == "accusation_made":
+            self.write(ACCUSATION, data["seat"], data["cards"])
+        elif event == "turn_started":
+            self.write(NEXT_TURN)
+
+    def close(self):
+        self.file.close()
+
+
+def open_journal(game, path, flush=True):
+    return JournalWriter(game, open(path, "ab"), flush)
+
+
+def iter_records(buffer, offset=0):
+    # Yields (offset, kind, values) without copying the buffer
+    end = len(buffer)
+    while offset < end:
+        kind = buffer[offset]
+        record = RECORDS.get(kind)
+        if record is None:
+            raise ValueError(f"Unknown journal record {kind!r} at byte {offset}")
+        if offset + 1 + record.size > end:
+            # A half-written record left behind by a crash
+            return
+        yield offset, kind, record.unpack_from(buffer, offset + 1)
+        offset += 1 + record.size
+
+
+def apply_record(game, kind, values):
+    mansion = game.mansion
+    if kind == ROLL:
+        game.remain_moves = values[1]
+    elif kind == MOVE:
+        game.move_player(game.players[values[0]], mansion.rooms[values[1]].name)
+    elif kind == TRAVEL:
+        game.go_to_room(game.players[values[0]], mansion.rooms[values[1]].name)
+    elif kind == SUGGESTION:
+        seat, cards, shown = values
+        character_name, weapon_name, _ = mansion.deck.card_names(cards)
+        game.make_suggestion(game.players[seat], character_name, weapon_name,
+                             None if shown == NONE else shown)
+    elif kind == ACCUSATION:
+        game.make_accusation(game.players[values[0]], *mansion.deck.card_names(values[1]))
+    elif kind == NEXT_TURN:
+        game.next_turn()
+
+
+def rebuild(buffer, turn=None, offset=0):
+    # Rebuild the game starting at offset, stopping once it reaches turn. Also
+    # returns where the last record applied ends, which is short of the end of
+    # the buffer when a crash left half a record behind, and whether the
+    # current player has already rolled this turn
+    game = None
+    end = offset
+    rolled = False
+    for record_offset, kind, values in iter_records(buffer, offset):
+        if kind == SNAPSHOT_RECORD:
+            if game is not None:
+                break
+            game = Game.restore(values[0], sink=None)
+        else:
+            if game is None:
+                raise ValueError(f"Journal at byte {offset} does not start with a snapshot")
+            if kind == NEXT_TURN and turn is not None and game.turn_count >= turn:
+                break
+            apply_record(game, kind, values)
+            if kind == ROLL:
+                rolled = True
+            elif kind == NEXT_TURN:
+                rolled = False
+        end = record_offset + 1 + RECORDS[kind].size
+    if game is None:
+        raise ValueError("Empty journal")
+    return game, end, rolled
+
+
+def replay(buffer, turn=None, sink=None, offset=0):
+    game, _, _ = rebuild(buffer, turn, offset)
+    game.sink = sink
+    return game
+
+
+class JournalReader:
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.buffer.close()
+        self.file.close()
+
+    def records(self, offset=0):
+        return iter_records(self.buffer, offset)
+
+    def games(self):
+        for offset, kind, values in self.records():
+            if kind == SNAPSHOT_RECORD:
+                yield offset
+
+    def replay(self, offset=0, turn=None, sink=None):
+        return replay(self.buffer, turn, sink, offset)
+
+    def recover(self):
+        # (game, bytes of complete records, rolled) for a journal that may end in a torn record
+        return rebuild(self.buffer)
+
+
+def snapshot_solution(snapshot):
+    deck = get_deck()
+    character_id, weapon_id, room_id = SNAPSHOT.unpack(snapshot)[9:12]
+    return ((1 << deck.character_card(character_id)) | (1 << deck.weapon_card(weapon_id)) |
+            (1 << deck.room_cards[room_id]))
+
+
+def archive_stats(reader):
+    counts = Counter()
+    wins = Counter()
+    solution = None
+    for offset, kind, values in reader.records():
+        counts[kind] += 1
+        if kind == SNAPSHOT_RECORD:
+            solution = snapshot_solution(values[0])
+        elif kind == ACCUSATION and values[1] == solution:
+            wins[values[0]] += 1
+    return counts, wins
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan an archive of game journals")
+    parser.add_argument("archive")
+    parser.add_argument("--replay", type=int, default=None, metavar="GAME",
+                        help="rebuild game number GAME (1-based) and show its state")
+    parser.add_argument("--turn", type=int, default=None)
+    args = parser.parse_args()
+
+    # A memory map cannot be made of an empty file
+    if not os.path.getsize(args.archive):
+        print(f"Archive has no game {args.replay}" if args.replay is not None else "Games: 0")
+        return
+    with JournalReader(args.archive) as reader:
+        if args.replay is not None:
+            for number, offset in enumerate(reader.games(), 1):
+                if number == args.replay:
+                    game = reader.replay(offset, args.turn)
+                    print(game.display_game_state())
+                    for player in game.players:
+                        print(f"  {player.name}: {player.position.name}, cards {', '.join(player.cards)}")
+                    break
+            else:
+                print(f"Archive has no game {args.replay}")
+            return
+
+        start = time.perf_counter()
+        counts, wins = archive_stats(reader)
+        elapsed = time.perf_counter() - start
+
+    games = counts[SNAPSHOT_RECORD]
+    print(f"Games: {games}")
+    if games:
+        print(f"Average turns: {counts[NEXT_TURN] / games:.1f}")
+        print(f"Suggestions: {counts[SUGGESTION]}, accusations: {counts[ACCUSATION]}")
+        for seat, won in sorted(wins.items()):
+            print(f"  Seat {seat + 1} wins: {won}")
+    print(f"Scanned {sum(counts.values())} records in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
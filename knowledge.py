@@ -0,0 +1,155 @@
+from cards import count_cards
+
+
+class Knowledge:
+
+    def __init__(self, seat, hand_sizes, deck, hand=0):
+        self.seat = seat
+        self.deck = deck
+        self.players = len(hand_sizes)
+        # Holder index `players` is the envelope holding the solution
+        self.envelope = self.players
+        self.categories = (deck.character_mask, deck.weapon_mask, deck.room_mask)
+        # The envelope holds one card of each category
+        self.hand_sizes = list(hand_sizes) + [len(self.categories)]
+        self.has = [0] * (self.players + 1)
+        self.lacks = [0] * (self.players + 1)
+        self.clauses = [[] for _ in range(self.players)]
+        self.wrong_accusations = []
+        if hand:
+            self.set_hand(hand)
+
+    @classmethod
+    def for_game(cls, game, seat):
+        hand_sizes = [count_cards(player.hand) for player in game.players]
+        return cls(seat, hand_sizes, game.mansion.deck, game.players[seat].hand)
+
+    def copy(self):
+        clone = Knowledge.__new__(Knowledge)
+        clone.seat = self.seat
+        clone.deck = self.deck
+        clone.players = self.players
+        clone.envelope = self.envelope
+        clone.hand_sizes = self.hand_sizes
+        clone.has = list(self.has)
+        clone.lacks = list(self.lacks)
+        clone.clauses = [list(clauses) for clauses in self.clauses]
+        clone.wrong_accusations = list(self.wrong_accusations)
+        clone.categories = self.categories
+        return clone
+
+    def __call__(self, event, data):
+        if event == "suggestion_made":
+            shown = data["shown"] if data["seat"] == self.seat else None
+            self.observe_suggestion(data["seat"], data["cards"], data["refuter"],
+                                    data["passed"], shown)
+        elif event == "accusation_made":
+            self.observe_accusation(data["cards"], data["correct"])
+        elif event == "cards_dealt" and data.get("seat") == self.seat:
+            self.set_hand(data["hand"])
+
+    def set_hand(self, hand):
+        self.has[self.seat] |= hand
+        self.lacks[self.seat] |= self.deck.full_mask & ~hand
+        self._propagate()
+
+    def observe_suggestion(self, suggester, cards, refuter, passed, shown=None):
+        for seat in passed:
+            self.lacks[seat] |= cards
+        if refuter is not None:
+            if shown is not None:
+                self.has[refuter] |= 1 << shown
+            elif refuter != self.seat:
+                self.clauses[refuter].append(cards)
+        self._propagate()
+
+    def observe_accusation(self, cards, correct):
+        if correct:
+            self.has[self.envelope] |= cards
+        else:
+            self.wrong_accusations.append(cards)
+        self._propagate()
+
+    def _state(self):
+        return (tuple(self.has), tuple(self.lacks),
+                sum(len(clauses) for clauses in self.clauses))
+
+    def _propagate(self):
+        full = self.deck.full_mask
+        holders = self.players + 1
+        has = self.has
+        lacks = self.lacks
+
+        while True:
+            before = self._state()
+
+            owned = 0
+            for holder in range(holders):
+                owned |= has[holder]
+            for holder in range(holders):
+                lacks[holder] |= owned & ~has[holder]
+
+            # A card every other holder lacks must be with this one
+            for holder in range(holders):
+                others_lack = full
+                for other in range(holders):
+                    if other != holder:
+                        others_lack &= lacks[other]
+                has[holder] |= others_lack & ~lacks[holder]
+
+            for holder in range(holders):
+                size = self.hand_sizes[holder]
+                if count_cards(has[holder]) == size:
+                    lacks[holder] |= full & ~has[holder]
+                possible = full & ~lacks[holder]
+                if count_cards(possible) == size:
+                    has[holder] |= possible
+
+            envelope = self.envelope
+            for category in self.categories:
+                if has[envelope] & category:
+                    lacks[envelope] |= category & ~has[envelope]
+                candidates = category & ~lacks[envelope]
+                if count_cards(candidates) == 1:
+                    has[envelope] |= candidates
+
+            for cards in self.wrong_accusations:
+                missing = cards & ~has[envelope]
+                if count_cards(missing) == 1:
+                    lacks[envelope] |= missing
+
+            for holder in range(self.players):
+                remaining = []
+                for clause in self.clauses[holder]:
+                    if clause & has[holder]:
+                        continue
+                    clause &= ~lacks[holder]
+                    if count_cards(clause) == 1:
+                        has[holder] |= clause
+                    elif clause:
+                        remaining.append(clause)
+                self.clauses[holder] = remaining
+
+            if self._state() == before:
+                return
+
+    def holder_of(self, card):
+        bit = 1 << card
+        for holder in range(self.players + 1):
+            if self.has[holder] & bit:
+                return holder
+        return None
+
+    def possible_solution(self):
+        return self.deck.full_mask & ~self.lacks[self.envelope]
+
+    def solution(self):
+        if count_cards(self.has[self.envelope]) == len(self.categories):
+            return self.has[self.envelope]
+        return None
+
+    def unknown_cards(self):
+        known = 0
+        for holder in range(self.players):
+            known |= self.has[holder]
+        return self.deck.full_mask & ~known
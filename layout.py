@@ -1,28 +1,41 @@
+import json
+import math
+import os
+from collections import Counter
+
+BOARDS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "boards")
+CLASSIC_BOARD = os.path.join(BOARDS_DIR, "classic.json")
+
+_board_files = {}
+
+
 class Character:
+    __slots__ = ("name", "color", "starting_room", "index")
+    
     def __init__(self, name, color, starting_room):
         self.name = name
         self.color = color
-        self.current_room = starting_room
         self.starting_room = starting_room
-    
-    def move_to(self, room):
-        self.current_room = room
+        self.index = None
 
 
 class Weapon:
+    __slots__ = ("name", "index")
+    
     def __init__(self, name):
         self.name = name
-        self.current_room = None
+        self.index = None
 
 
 class Room:
+    __slots__ = ("name", "room_type", "rooms_connection", "secret_passage", "index")
+    
     def __init__(self, name, room_type="main"):
         self.name = name
         self.room_type = room_type 
         self.rooms_connection = []
-        self.characters = []
-        self.weapons = []
         self.secret_passage = None
+        self.index = None
     
     def to_connection(self, room):
         
@@ -30,128 +43,197 @@ class Room:
             self.rooms_connection.append(room)
         if self not in room.rooms_connection:
             room.rooms_connection.append(self)
-            
-    def character_added(self, character):
-        if character not in self.characters:
-            self.characters.append(character)
-    
-    def character_remove(self, character):
-        if character in self.characters:
-            self.characters.remove(character)
-    
-    def add_weapon(self, weapon):
-        if weapon not in self.weapons:
-            self.weapons.append(weapon)
-            weapon.current_room = self
-    
-    def remove_weapon(self, weapon):
-        if weapon in self.weapons:
-            self.weapons.remove(weapon)
-            weapon.current_room = None
-
-
-def game_characters(rooms_dict):
-    return [
-        Character("Miss Scarlett", "red", rooms_dict["Lounge"]),
-        Character("Colonel Mustard", "yellow", rooms_dict["Dining Room"]), 
-        Character("Mrs. White", "white", rooms_dict["Ballroom"]),
-        Character("Reverend Green", "green", rooms_dict["Conservatory"]),
-        Character("Mrs. Peacock", "blue", rooms_dict["Library"]),
-        Character("Professor Plum", "purple", rooms_dict["Study"])
-    ]
-
-
-def game_weapons():
-    return [
-        Weapon("Candlestick"),
-        Weapon("Dagger"), 
-        Weapon("Lead Pipe"),
-        Weapon("Revolver"),
-        Weapon("Rope"),
-        Weapon("Wrench")
-    ]
-
-
-def game_rooms():
-    kitchen = Room("Kitchen", "main")
-    ballroom = Room("Ballroom", "main")
-    conservatory = Room("Conservatory", "main")
-    dining_room = Room("Dining Room", "main")
-    billiard_room = Room("Billiard Room", "main")
-    library = Room("Library", "main")
-    lounge = Room("Lounge", "main")
-    hall = Room("Hall", "main")
-    study = Room("Study", "main")
-    
-    Loung_hallway = Room("Hallway_Hall_Lounge", "hallway")
-    Billiard_hallway = Room("Hallway_Hall_Billiard", "hallway")
-    Study_hallway = Room("Hallway_Hall_Study", "hallway")
-    Dining_Lounge_hallway = Room("Hallway_Lounge_Dining", "hallway")
-    Billiard_Dining_hallway = Room("Hallway_Dining_Billiard", "hallway")
-    Library_Billiard_hallway = Room("Hallway_Billiard_Library", "hallway")
-    Conservatory_Library_hallyway  = Room("Hallway_Library_Conservatory", "hallway")
-    Ballroom_Conservatory_hallway = Room("Hallway_Conservatory_Ballroom", "hallway")
-    Kitchen_Calroom_hallway = Room("Hallway_Ballroom_Kitchen", "hallway")
-    Kirchen_hallway_Dining = Room("Hallway_Kitchen_Dining", "hallway")
-    Study_hallway_Library = Room("Hallway_Study_Library", "hallway")
-    Ballroom_hallway_Billiard = Room("Hallway_Ballroom_Billiard", "hallway")
-    
-    hall.to_connection(Loung_hallway)
-    hall.to_connection(Billiard_hallway)
-    hall.to_connection(Study_hallway)
-    
-    lounge.to_connection(Loung_hallway)
-    lounge.to_connection(Dining_Lounge_hallway)
-    
-    dining_room.to_connection(Dining_Lounge_hallway)
-    dining_room.to_connection(Billiard_Dining_hallway)
-    dining_room.to_connection(Kirchen_hallway_Dining)
-    
-    billiard_room.to_connection(Billiard_hallway)
-    billiard_room.to_connection(Billiard_Dining_hallway)
-    billiard_room.to_connection(Library_Billiard_hallway)
-    billiard_room.to_connection(Ballroom_hallway_Billiard)
-    
-    library.to_connection(Library_Billiard_hallway)
-    library.to_connection(Conservatory_Library_hallyway )
-    library.to_connection(Study_hallway_Library)
-    
-    conservatory.to_connection(Conservatory_Library_hallyway )
-    conservatory.to_connection(Ballroom_Conservatory_hallway)
-    
-    ballroom.to_connection(Ballroom_Conservatory_hallway)
-    ballroom.to_connection(Kitchen_Calroom_hallway)
-    ballroom.to_connection(Ballroom_hallway_Billiard)
-    
-    kitchen.to_connection(Kitchen_Calroom_hallway)
-    kitchen.to_connection(Kirchen_hallway_Dining)
-    
-    study.to_connection(Study_hallway)
-    study.to_connection(Study_hallway_Library)
-    
-    study.secret_passage = kitchen
-    kitchen.secret_passage = study
-    conservatory.secret_passage = lounge
-    lounge.secret_passage = conservatory
-    
-    different_room = {
-        "Kitchen": kitchen,
-        "Ballroom": ballroom,
-        "Conservatory": conservatory,
-        "Dining Room": dining_room,
-        "Billiard Room": billiard_room,
-        "Library": library,
-        "Lounge": lounge,
-        "Hall": hall,
-        "Study": study
+
+
+def _entry(entry):
+    # Rooms, characters and weapons may be a plain name or an object with a name
+    if isinstance(entry, str):
+        return {"name": entry}
+    return entry
+
+
+class Layout:
+
+    def __init__(self, data):
+        validate_layout(data)
+        self.name = data.get("name", "Custom")
+        self.map_lines = list(data.get("map", []))
+        self.legend = data.get("legend")
+        self.aliases = {"rooms": {}, "characters": {}, "weapons": {}}
+
+        self.rooms = []
+        self.different_room = {}
+        for entry in map(_entry, data["rooms"]):
+            room = Room(entry["name"], "main")
+            self.rooms.append(room)
+            self.different_room[room.name] = room
+            self.aliases["rooms"][room.name] = entry.get("aliases", [])
+        for name in data.get("hallways", []):
+            self.rooms.append(Room(name, "hallway"))
+
+        rooms_dict = {room.name: room for room in self.rooms}
+        for first, second in data["edges"]:
+            rooms_dict[first].to_connection(rooms_dict[second])
+        for first, second in data.get("secret_passages", []):
+            rooms_dict[first].secret_passage = rooms_dict[second]
+            rooms_dict[second].secret_passage = rooms_dict[first]
+
+        self.characters = []
+        for entry in data["characters"]:
+            self.characters.append(Character(entry["name"], entry.get("color"), rooms_dict[entry["start"]]))
+            self.aliases["characters"][entry["name"]] = entry.get("aliases", [])
+        self.weapons = []
+        for entry in map(_entry, data["weapons"]):
+            self.weapons.append(Weapon(entry["name"]))
+            self.aliases["weapons"][entry["name"]] = entry.get("aliases", [])
+
+
+def validate_layout(data):
+    errors = []
+    if not isinstance(data, dict):
+        raise ValueError("A board must be a JSON object")
+    for key in ("rooms", "edges", "characters", "weapons"):
+        if not isinstance(data.get(key), list) or not data[key]:
+            errors.append(f"'{key}' must be a non-empty list")
+    if errors:
+        raise ValueError("Invalid board: " + "; ".join(errors))
+
+    def names_of(key, entries):
+        names = []
+        for entry in entries:
+            name = _entry(entry).get("name") if isinstance(entry, (str, dict)) else None
+            if not isinstance(name, str) or not name.strip():
+                errors.append(f"'{key}' has an entry without a name: {entry!r}")
+            else:
+                names.append(name)
+        for name, count in Counter(names).items():
+            if count > 1:
+                errors.append(f"'{key}' lists {name} more than once")
+        return names
+
+    main_rooms = names_of("rooms", data["rooms"])
+    hallways = names_of("hallways", data.get("hallways", []))
+    names_of("weapons", data["weapons"])
+    for name in set(main_rooms) & set(hallways):
+        errors.append(f"{name} is both a room and a hallway")
+    main_set = set(main_rooms)
+    all_rooms = main_set | set(hallways)
+
+    neighbours = {name: set() for name in all_rooms}
+    for edge in data["edges"]:
+        if not (isinstance(edge, list) and len(edge) == 2):
+            errors.append(f"Edge {edge!r} must be a pair of room names")
+            continue
+        first, second = edge
+        unknown = [name for name in edge if name not in all_rooms]
+        if unknown:
+            errors.append(f"Edge {edge!r} names unknown rooms: {', '.join(map(str, unknown))}")
+        elif first == second:
+            errors.append(f"Edge {edge!r} connects a room to itself")
+        else:
+            neighbours[first].add(second)
+            neighbours[second].add(first)
+
+    passage_rooms = []
+    for passage in data.get("secret_passages", []):
+        if not (isinstance(passage, list) and len(passage) == 2) or passage[0] == passage[1]:
+            errors.append(f"Secret passage {passage!r} must join two different rooms")
+            continue
+        for name in passage:
+            if name not in main_set:
+                errors.append(f"Secret passage {passage!r} must join main rooms, not {name}")
+        passage_rooms.extend(passage)
+        if all(name in all_rooms for name in passage):
+            neighbours[passage[0]].add(passage[1])
+            neighbours[passage[1]].add(passage[0])
+    for name, count in Counter(passage_rooms).items():
+        if count > 1:
+            errors.append(f"{name} has more than one secret passage")
+
+    characters = data["characters"]
+    character_names = []
+    for entry in characters:
+        if not isinstance(entry, dict) or not isinstance(entry.get("name"), str):
+            errors.append(f"Character {entry!r} needs a name and a start room")
+            continue
+        character_names.append(entry["name"])
+        if entry.get("start") not in main_set:
+            errors.append(f"{entry['name']} must start in a main room, not {entry.get('start')!r}")
+    for name, count in Counter(character_names).items():
+        if count > 1:
+            errors.append(f"'characters' lists {name} more than once")
+    if len(characters) < 3:
+        errors.append("A board needs at least 3 characters")
+    if len(data["weapons"]) > len(main_rooms):
+        errors.append(f"{len(data['weapons'])} weapons need at least as many main rooms, "
+                      f"found {len(main_rooms)}")
+
+    # Every room must be reachable from the first main room
+    if main_rooms and not errors:
+        seen = {main_rooms[0]}
+        stack = [main_rooms[0]]
+        while stack:
+            for neighbour in neighbours[stack.pop()]:
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    stack.append(neighbour)
+        unreachable = sorted(all_rooms - seen)
+        if unreachable:
+            shown = ", ".join(unreachable[:5]) + (" ..." if len(unreachable) > 5 else "")
+            errors.append(f"{len(unreachable)} rooms cannot be reached from {main_rooms[0]}: {shown}")
+
+    if errors:
+        raise ValueError("Invalid board: " + "; ".join(errors))
+
+
+def read_board_file(path):
+    data = _board_files.get(path)
+    if data is None:
+        with open(path, encoding="utf-8") as board_file:
+            data = json.load(board_file)
+        _board_files[path] = data
+    return data
+
+
+def load_layout(path=CLASSIC_BOARD):
+    try:
+        return Layout(read_board_file(path))
+    except ValueError as e:
+        raise ValueError(f"{path}: {e}") from None
+
+
+def generate_layout_data(main_rooms, rng, hallway_length=2, characters=6, weapons=6):
+    # A grid of main rooms, each joined to its right and lower neighbours by a
+    # corridor of 1..hallway_length hallways, plus a few secret passages
+    side = math.ceil(math.sqrt(main_rooms))
+    rooms = [f"Room {i + 1}" for i in range(main_rooms)]
+    hallways = []
+    edges = []
+    for i in range(main_rooms):
+        row, column = divmod(i, side)
+        for j in (i + 1 if column + 1 < side else None, i + side):
+            if j is None or j >= main_rooms:
+                continue
+            previous = rooms[i]
+            for _ in range(rng.randint(1, hallway_length)):
+                hallway = f"Hallway {len(hallways) + 1}"
+                hallways.append(hallway)
+                edges.append([previous, hallway])
+                previous = hallway
+            edges.append([previous, rooms[j]])
+
+    shuffled = rooms[:]
+    rng.shuffle(shuffled)
+    passages = max(main_rooms // 50, 1) if main_rooms >= 4 else 0
+    secret_passages = [[shuffled[2 * k], shuffled[2 * k + 1]] for k in range(passages)]
+    return {
+        "name": f"Generated {main_rooms}",
+        "rooms": rooms,
+        "hallways": hallways,
+        "edges": edges,
+        "secret_passages": secret_passages,
+        "characters": [{"name": f"Suspect {k + 1}", "color": "grey", "start": rng.choice(rooms)}
+                       for k in range(characters)],
+        "weapons": [f"Weapon {k + 1}" for k in range(weapons)],
     }
-    
-    all_rooms = [
-        kitchen, ballroom, conservatory, dining_room, billiard_room,
-        library, lounge, hall, study,
-        Loung_hallway, Billiard_hallway, Study_hallway, Dining_Lounge_hallway, Billiard_Dining_hallway,
-        Library_Billiard_hallway, Conservatory_Library_hallyway , Ballroom_Conservatory_hallway, Kitchen_Calroom_hallway, Kirchen_hallway_Dining,
-        Study_hallway_Library, Ballroom_hallway_Billiard
-    ]
-    
-    return all_rooms, different_room
\ No newline at end of file
+
@@ -1,12 +1,16 @@
-import os
+import argparse
+import io
+import random
 import sys
 from game import Game
+from events import ConsoleSink
+from registry import get_registry
+from bots import add_bots
+from screen import SCREEN, GameView, ScriptedScreen
+from commands import get_grammar
 
-def clear_screen():
-    os.system('cls' if os.name == 'nt' else 'clear')
 
-
-def print_banner():
+def print_banner(screen=SCREEN):
     banner = r"""
     The Cluedo
     ================================================
@@ -16,10 +20,13 @@ def print_banner():
     - every time you enter ib room, you MUST make a suggestion
     - Suggestions move the accused character and weapon to your current room. Example, Miss Scarlett Revolver 
     - You cannot make suggestions in hallways
+    - The next player clockwise holding a suggested card shows you one of them
 
     COMMANDS:
     move [room]              - Move to connected room (uses 1 move)
-    suggest [char] [weapon]  - Make suggestion (AUTO-TRIGGERED in rooms)
+    go [room]                - Walk the shortest path to any room
+    suggest [char] [weapon]  - Make the suggestion due after entering a room
+    accuse [char] [weapon] [room] - Final accusation (wrong = out of the game)
     status                   - Show your current status
     map                      - Show mansion map
     help                     - Show these instructions
@@ -28,7 +35,9 @@ def print_banner():
 
     EXAMPLES:
     move "Dining Room"     
-    - Move to Dining Room (will auto-trigger suggestion)
+    - Move to Dining Room (a suggestion is then due)
+    go Kitchen
+    - Walk to the Kitchen, stopping early in any room you enter on the way
     suggest "Miss Scarlett" Revolver
 
     CHARACTERS (6):
@@ -42,268 +51,263 @@ def print_banner():
     - Kitchen, Ballroom, Conservatory, Dining Room, Billiard Room
     - Library, Lounge, Hall, Study
     """
-    print(banner)
+    screen.write(banner)
 
 
-def handle_auto_suggestion(game, player):
-    print(f"\nYOU ENTERED A ROOM! You must make a suggestion.")
-    print("Available characters:", ", ".join([c.name for c in game.mansion.characters]))
-    print("Available weapons:", ", ".join([w.name for w in game.mansion.weapons]))
-    
-    while True:
-        suggestion_input = input("\nMake your suggestion (format: 'Character Weapon'): ").strip()
-        
-        if not suggestion_input:
-            print("You must make a suggestion to continue.")
-            continue
-            
-        parts = suggestion_input.split()
-        if len(parts) < 2:
-            print("Invalid format. Use: 'Character Weapon'")
-            continue
+def announce_suggestion(game, screen=SCREEN):
+    screen.write(f"\nYOU ENTERED A ROOM! You must make a suggestion.")
+    screen.write(f"Available characters: {', '.join([c.name for c in game.mansion.characters])}")
+    screen.write(f"Available weapons: {', '.join([w.name for w in game.mansion.weapons])}")
 
-        character_parts = []
-        weapon_parts = []
-        found_weapon = False
-        
-        weapon_keywords = ['candlestick', 'dagger', 'lead', 'revolver', 'rope', 'wrench']
-        
-        for part in parts:
-            if not found_weapon and part.lower() in weapon_keywords:
-                found_weapon = True
-                weapon_parts.append(part)
-            elif not found_weapon:
-                character_parts.append(part)
-            else:
-                weapon_parts.append(part)
-        
-        character_name = ' '.join(character_parts)
-        weapon_name = ' '.join(weapon_parts)
-        
-        if not character_name or not weapon_name:
-            print("Please specify both character and weapon.")
-            continue
 
-        character_name = fix_character_name(character_name)
-        weapon_name = fix_weapon_name(weapon_name)
-        
-        success, message = game.make_suggestion(player, character_name, weapon_name)
-        print(f"\n{message}")
-        
-        if success:
-            break
-        else:
-            print("Please try again.")
+def parse_command(game, text, verb=None):
+    return get_grammar(game.mansion.registry).parse(text, verb)
 
 
 def handle_suggestion_command(game, player, command_parts):
-    if len(command_parts) < 3:
-        return False, "Invalid suggestion format"
-    
-    character_name = ""
-    weapon_name = ""
-    
-    weapon_keywords = ['candlestick', 'dagger', 'lead', 'revolver', 'rope', 'wrench']
-    
-    found_weapon_index = -1
-    for i, part in enumerate(command_parts[1:]):
-        if part.lower() in weapon_keywords:
-            found_weapon_index = i + 1
-            break
-    
-    if found_weapon_index != -1:
-        character_name = ' '.join(command_parts[1:found_weapon_index])
-        weapon_name = ' '.join(command_parts[found_weapon_index:])
-    else:
-        if len(command_parts) >= 3:
-            weapon_name = command_parts[-1]
-            character_name = ' '.join(command_parts[1:-1])
-        else:
-            return False, "Could not parse character and weapon. Use: suggest 'Miss Scarlett' Revolver"
-    
-    # Fix names
-    character_name = fix_character_name(character_name.strip())
-    weapon_name = fix_weapon_name(weapon_name.strip())
-    
-    return game.make_suggestion(player, character_name, weapon_name)
+    command, error = parse_command(game, ' '.join(command_parts[1:]), "suggest")
+    if error:
+        return False, error
+    names = get_grammar(game.mansion.registry).names(command)
+    return game.make_suggestion(player, names["character"], names["weapon"])
+
+
+def handle_accusation_command(game, player, command_parts):
+    command, error = parse_command(game, ' '.join(command_parts[1:]), "accuse")
+    if error:
+        return False, error
+    names = get_grammar(game.mansion.registry).names(command)
+    return game.make_accusation(player, names["character"], names["weapon"], names["room"])
 
 
 def fix_character_name(name):
-    name_lower = name.lower()
-    
-    if name_lower in ["miss scarlett", "ms scarlett", "scarlett", "miss"]:
-        return "Miss Scarlett"
-    elif name_lower in ["colonel mustard", "col mustard", "mustard", "colonel"]:
-        return "Colonel Mustard"
-    elif name_lower in ["mrs white", "mrs. white", "white", "mrs"]:
-        return "Mrs. White"
-    elif name_lower in ["reverend green", "mr green", "mr. green", "green", "reverend"]:
-        return "Reverend Green"
-    elif name_lower in ["mrs peacock", "mrs. peacock", "peacock"]:
-        return "Mrs. Peacock"
-    elif name_lower in ["professor plum", "prof plum", "plum", "professor"]:
-        return "Professor Plum"
-    
-    return name
+    return get_registry().character_name(name) or name
 
 
 def fix_weapon_name(name):
-    name_lower = name.lower()
-    
-    if name_lower in ["candlestick", "candle"]:
-        return "Candlestick"
-    elif name_lower == "dagger":
-        return "Dagger"
-    elif name_lower in ["lead", "pipe", "lead pipe"]:
-        return "Lead Pipe"
-    elif name_lower in ["revolver", "gun"]:
-        return "Revolver"
-    elif name_lower == "rope":
-        return "Rope"
-    elif name_lower == "wrench":
-        return "Wrench"
-    
-    return name
+    return get_registry().weapon_name(name) or name
 
 
-def main():
-    clear_screen()
-    print_banner()
+def play(screen=SCREEN, rng=None, banner=True):
+    screen.clear()
+    screen.draw([])
+    if banner:
+        print_banner(screen)
 
     while True:
         try:
-            gamePlayers = int(input("\nAdd no of players (3-6): "))
+            gamePlayers = int(screen.input("\nAdd no of players (3-6): "))
             if 3 <= gamePlayers <= 6:
                 break
             else:
-                print("Please enter a number between 3 and 6.")
+                screen.write("Please enter a number between 3 and 6.")
         except ValueError:
-            print("Please enter a valid number.")
-        except KeyboardInterrupt:
-            print("\nGame cancelled.")
+            screen.write("Please enter a valid number.")
+        except (KeyboardInterrupt, EOFError):
+            screen.write("\nGame cancelled.")
+            return
+    
+    while True:
+        try:
+            computerPlayers = int(screen.input(f"How many of them are computer players? (0-{gamePlayers - 1}): ") or 0)
+            if 0 <= computerPlayers < gamePlayers:
+                break
+            else:
+                screen.write(f"Please enter a number between 0 and {gamePlayers - 1}.")
+        except ValueError:
+            screen.write("Please enter a valid number.")
+        except (KeyboardInterrupt, EOFError):
+            screen.write("\nGame cancelled.")
             return
     try:
-        game = Game(gamePlayers)
-        print(f"\nStarting positions:")
+        game = Game(gamePlayers, sink=ConsoleSink(screen.write), rng=rng)
+        # One process per bot is plenty for a single local game
+        add_bots(game, range(gamePlayers - computerPlayers, gamePlayers), rng=rng, workers=1)
+        screen.write(f"\nStarting positions:")
         for player in game.players:
-            print(f"  {player.name} ({player.character.name}) starts in {player.character.starting_room.name}")
+            screen.write(f"  {player.name} ({player.character.name}) starts in {player.character.starting_room.name}")
         
-        print(f"\nWeapon locations:")
+        screen.write(f"\nWeapon locations:")
         weapon_locations = {}
         for room in game.mansion.rooms:
-            if room.weapons and game.mansion.is_main_room(room):
-                for weapon in room.weapons:
+            if game.mansion.is_main_room(room):
+                for weapon in game.mansion.weapons_in(room):
                     weapon_locations[weapon.name] = room.name
         
         for weapon_name, room_name in weapon_locations.items():
-            print(f"{weapon_name}: {room_name}")
-        
-        print("\nREMEMBER: When you enter a room, you MUST make a suggestion!")
-        input("\nPress Enter to start the game...")
+            screen.write(f"{weapon_name}: {room_name}")
         
+        screen.write("\nREMEMBER: When you enter a room, you MUST make a suggestion!")
+        screen.pause("\nPress Enter to start the game...")
     except Exception as e:
-        print(f"Error initializing game: {e}")
+        screen.write(f"Error initializing game: {e}")
         return
     
+    view = GameView(game)
+    screen.clear()
     while not game.game_over:
-        clear_screen()
         current_player = game.get_current_player()
+        screen.show(view)
         
-        print_banner()
-        print(game.display_game_state())
-        
-        if game.remain_moves == 0 and not current_player.must_suggest:
-            print(f"\n {current_player.name}'s turn - Rolling dice...")
-            input("Press Enter to roll dice...")
-            dice_roll = game.start_turn()
-            print(f"You rolled a {dice_roll}! You have {game.remain_moves} moves.")
-            input("Press Enter to continue...")
-            continue 
-        
-        print(game.display_player_status(current_player))
+        try:
+            if current_player.bot:
+                screen.write(f"\n{current_player.name} (computer) is playing...")
+                for message in current_player.bot.play_turn(game):
+                    screen.write(message)
+                screen.pause("\nPress Enter to continue...")
+                continue
         
-        if current_player.must_suggest:
-            handle_auto_suggestion(game, current_player)
-            input("\nPress Enter to continue...")
-            continue
+            if game.remain_moves == 0 and not current_player.must_suggest:
+                screen.write(f"\n {current_player.name}'s turn - Rolling dice...")
+                screen.pause("Press Enter to roll dice...")
+                dice_roll = game.start_turn()
+                screen.write(f"You rolled a {dice_roll}! You have {game.remain_moves} moves.")
+                screen.pause("Press Enter to continue...")
+                continue 
         
-        try:
-            command = input("\nEnter command: ").strip()
-            if not command:
+            if current_player.must_suggest:
+                text = screen.input("\nMake your suggestion (suggest Character Weapon): ").strip()
+            else:
+                text = screen.input("\nEnter command: ").strip()
+            if not text:
                 continue
-                
-            command_lower = command.lower()
-            command_parts = command.split()
-            
-            if command_lower == "quit":
-                if input("Are you sure you want to quit? (y/n): ").lower() == 'y':
-                    print("Thanks for playing Cluedo!")
-                    break
             
-            elif command_lower == "help":
-                print_instructions()
-                input("\nPress Enter to continue...")
-            
-            elif command_lower == "status":
-                input("\nPress Enter to continue...")
+            command, error = parse_command(game, text)
+            if error and current_player.must_suggest:
+                # "Character Weapon" on its own is taken as the suggestion that is due
+                command, _ = parse_command(game, text, "suggest")
+            if command is None:
+                screen.write(error)
+                screen.pause("Press Enter to continue...")
+                continue
+            verb = command.verb
+            if current_player.must_suggest and verb not in ("suggest", "status", "map", "help", "quit"):
+                screen.write("You must make a suggestion first. Use: suggest 'Miss Scarlett' Revolver")
+                continue
+            names = get_grammar(game.mansion.registry).names(command)
             
-            elif command_lower == "map":
-                print("\n" + game.mansion.get_simple_map(current_player.position.name))
-                input("\nPress Enter to continue...")
+            if verb == "quit":
+                if screen.input("Are you sure you want to quit? (y/n): ").lower() == 'y':
+                    screen.write("Thanks for playing Cluedo!")
+                    break
             
-            elif command_lower == "end":
+            elif verb == "help":
+                print_banner(screen)
+                screen.pause("\nPress Enter to continue...")
+            elif verb == "status":
+                # A terminal already shows it in the frame; a transcript has none
+                if not screen.frames:
+                    screen.write(view.status(current_player))
+                screen.pause("\nPress Enter to continue...")
+            elif verb == "map":
+                screen.write("\n" + view.map(current_player.position))
+                screen.pause("\nPress Enter to continue...")
+            elif verb == "end":
                 if current_player.must_suggest:
-                    print("You cannot end your turn without making a suggestion! You entered a room.")
-                    input("Press Enter to continue...")
+                    screen.write("You cannot end your turn without making a suggestion! You entered a room.")
+                    screen.pause("Press Enter to continue...")
                     continue
                     
                 if game.remain_moves > 0:
-                    print(f"You ended your turn with {game.remain_moves} moves remaining.")
+                    screen.write(f"You ended your turn with {game.remain_moves} moves remaining.")
                 else:
-                    print("You ended your turn.")
+                    screen.write("You ended your turn.")
                     
                 game.next_turn()
-                print(f"\nTurn passed to {game.get_current_player().name}")
-                input("Press Enter to continue...")
-            
-            elif command_lower.startswith("move "):
+                screen.write(f"\nTurn passed to {game.get_current_player().name}")
+                screen.pause("Press Enter to continue...")
+            elif verb == "move":
                 if game.remain_moves <= 0:
-                    print("No moves remaining. You need to end your turn.")
-                    input("Press Enter to continue...")
+                    screen.write("No moves remaining. You need to end your turn.")
+                    screen.pause("Press Enter to continue...")
                     continue
                 
-                target_room = ' '.join(command_parts[1:])
-                success, message, requires_suggestion = game.move_player(current_player, target_room)
-                print(f"\n{message}")
+                success, message, requires_suggestion = game.move_player(current_player, names["room"])
+                screen.write(f"\n{message}")
                 
                 if success and requires_suggestion:
-                    input("\nPress Enter to make your suggestion...")
-                
+                    announce_suggestion(game, screen)
                 elif success:
-                    input("\nPress Enter to continue...")
+                    screen.pause("\nPress Enter to continue...")
+            elif verb == "go":
+                if game.remain_moves <= 0:
+                    screen.write("No moves remaining. You need to end your turn.")
+                    screen.pause("Press Enter to continue...")
+                    continue
                 
-            elif command_lower.startswith("suggest "):
+                success, message, requires_suggestion = game.go_to_room(current_player, names["room"])
+                screen.write(f"\n{message}")
+                
+                if success and requires_suggestion:
+                    announce_suggestion(game, screen)
+                else:
+                    screen.pause("\nPress Enter to continue...")
+            elif verb == "accuse":
+                if screen.input("An accusation is final. Are you sure? (y/n): ").lower() != 'y':
+                    continue
+                
+                success, message = game.make_accusation(current_player, names["character"],
+                                                        names["weapon"], names["room"])
+                screen.write(f"\n{message}")
+                screen.pause("\nPress Enter to continue...")
+                if success and current_player.eliminated and not game.game_over:
+                    game.next_turn()
+                
+            elif verb == "suggest":
                 if not game.mansion.is_main_room(current_player.position):
-                    print("You can only make suggestions when in a main room, not a hallway.")
-                    input("Press Enter to continue...")
+                    screen.write("You can only make suggestions when in a main room, not a hallway.")
+                    screen.pause("Press Enter to continue...")
                     continue
                     
-                success, message = handle_suggestion_command(game, current_player, command_parts)
-                print(f"\n{message}")
-                input("\nPress Enter to continue...")
-            
-            else:
-                print("Invalid command. Type 'help' for available commands.")
-                input("Press Enter to continue...")
-                
-        except KeyboardInterrupt:
-            print("\nGame interrupted.")
+                success, message = game.make_suggestion(current_player, names["character"], names["weapon"])
+                screen.write(f"\n{message}")
+                screen.pause("\nPress Enter to continue...")
+        except (KeyboardInterrupt, EOFError):
+            screen.write("\nGame interrupted.")
             break
         except Exception as e:
-            print(f"Error: {e}")
-            input("Press Enter to continue...")
+            screen.write(f"Error: {e}")
+            screen.pause("Press Enter to continue...")
+    if game.winner is not None:
+        winner = game.players[game.winner]
+        solution = game.mansion.solution
+        screen.write(f"\n{winner.name} ({winner.character.name}) solved the murder: "
+              f"{solution['character'].name} with the {solution['weapon'].name} "
+              f"in the {solution['room'].name}.")
     
-    print("\nGame over! Thanks for playing Cluedo Part 1!")
+    screen.write("\nGame over! Thanks for playing Cluedo Part 1!")
+
+
+def run_script(lines, seed=None):
+    # Plays one recorded session and returns its transcript
+    out = io.StringIO()
+    play(ScriptedScreen(lines, out), random.Random(seed), banner=False)
+    return out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play Cluedo in the terminal")
+    parser.add_argument("--script", default=None, metavar="PATH",
+                        help="read commands from PATH ('-' for stdin) instead of the keyboard")
+    parser.add_argument("--transcript", default=None, metavar="PATH",
+                        help="with --script, write the transcript here instead of stdout")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed the game so a script replays the same way")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed) if args.seed is not None else None
+    if not args.script:
+        play(SCREEN, rng)
+        return
+    commands = sys.stdin if args.script == "-" else open(args.script)
+    out = open(args.transcript, "w") if args.transcript else None
+    try:
+        play(ScriptedScreen(commands, out), rng, banner=False)
+    finally:
+        if commands is not sys.stdin:
+            commands.close()
+        if out:
+            out.close()
 
 
 if __name__ == "__main__":
@@ -1,53 +1,182 @@
 import random
-from layout import game_rooms, game_characters, game_weapons
+from layout import load_layout
+from board import compile_board
+from registry import Registry, get_registry
+from cards import Deck, get_deck
+
+_default_template = None
+
+
+class MansionTemplate:
+    # Rooms, characters and weapons never change during a game, so one set is
+    # built per board and shared; each Mansion only keeps positions
+
+    def __init__(self, layout=None):
+        if layout is None:
+            layout = load_layout()
+            self.registry = get_registry()
+            self.deck = get_deck()
+        else:
+            self.registry = Registry.for_layout(layout)
+            self.deck = Deck(self.registry)
+        self.layout = layout
+        self.rooms = layout.rooms
+        self.different_room = layout.different_room
+        self.main_rooms = list(self.different_room.values())
+        self.characters = layout.characters
+        self.weapons = layout.weapons
+        self.board = compile_board(self.rooms)
+        for entities in (self.rooms, self.characters, self.weapons):
+            for i, entity in enumerate(entities):
+                entity.index = i
+        self.entity_cards = {}
+        for i, character in enumerate(self.characters):
+            self.entity_cards[character] = self.deck.character_card(i)
+        for i, weapon in enumerate(self.weapons):
+            self.entity_cards[weapon] = self.deck.weapon_card(i)
+        for room_id, card in self.deck.room_cards.items():
+            self.entity_cards[self.rooms[room_id]] = card
+        self.starting_positions = tuple(character.starting_room.index
+                                        for character in self.characters)
+
+
+def get_template():
+    global _default_template
+    if _default_template is None:
+        _default_template = MansionTemplate()
+    return _default_template
+
 
 class Mansion:
-    def __init__(self):
-        self.rooms, self.different_room = game_rooms()
-        self.characters = game_characters(self.different_room)
-        self.weapons = game_weapons()
+    def __init__(self, rng=None, template=None):
+        self._attach(rng, template)
+        # Room indices, one per character, weapon and player seat, and the
+        # character and weapon cards in each room as a mask
+        self.character_positions = list(self.template.starting_positions)
+        self.weapon_positions = [None] * len(self.weapons)
+        self.player_positions = list(self.template.starting_positions)
+        self._index_occupancy()
+        self._set_solution(self.rng.choice(self.characters),
+                           self.rng.choice(self.weapons),
+                           self.rng.choice(self.template.main_rooms))
+        self.give_weapons()
+    
+    def _attach(self, rng, template):
+        self.rng = rng if rng is not None else random
+        self.template = template if template is not None else get_template()
+        self.rooms = self.template.rooms
+        self.different_room = self.template.different_room
+        self.characters = self.template.characters
+        self.weapons = self.template.weapons
+        self.board = self.template.board
+        self.registry = self.template.registry
+        self.deck = self.template.deck
+        self.entity_cards = self.template.entity_cards
+    
+    def _index_occupancy(self):
+        # Plain ints rather than an array("Q"), so boards may have more than 64 cards
+        self.occupancy = [0] * len(self.rooms)
+        for character, position in zip(self.characters, self.character_positions):
+            self.occupancy[position] |= 1 << self.entity_cards[character]
+        for weapon, position in zip(self.weapons, self.weapon_positions):
+            if position is not None:
+                self.occupancy[position] |= 1 << self.entity_cards[weapon]
+    
+    def _set_solution(self, character, weapon, room):
         self.solution = {
-            'character': random.choice(self.characters),
-            'weapon': random.choice(self.weapons),
-            'room': random.choice(list(self.different_room.values()))
+            'character': character,
+            'weapon': weapon,
+            'room': room
         }
-        self.give_weapons()
+        self.solution_mask = self.suggestion_mask(character, weapon, room)
+    
+    @classmethod
+    def restore(cls, solution, character_positions, weapon_positions, player_positions,
+                rng=None, template=None):
+        mansion = cls.__new__(cls)
+        mansion._attach(rng, template)
+        character_id, weapon_id, room_id = solution
+        mansion._set_solution(mansion.characters[character_id], mansion.weapons[weapon_id],
+                              mansion.rooms[room_id])
+        mansion.character_positions = list(character_positions)
+        mansion.weapon_positions = list(weapon_positions)
+        mansion.player_positions = list(player_positions)
+        mansion._index_occupancy()
+        return mansion
+    
+    def copy(self, rng=None):
+        mansion = Mansion.__new__(Mansion)
+        state = self.__dict__.copy()
+        if rng is not None:
+            state["rng"] = rng
+        state["character_positions"] = self.character_positions[:]
+        state["weapon_positions"] = self.weapon_positions[:]
+        state["player_positions"] = self.player_positions[:]
+        state["occupancy"] = self.occupancy[:]
+        mansion.__dict__ = state
+        return mansion
+    
+    def suggestion_mask(self, character, weapon, room):
+        cards = self.entity_cards
+        return (1 << cards[character]) | (1 << cards[weapon]) | (1 << cards[room])
     
     def give_weapons(self):
-        main_rooms = list(self.different_room.values())
-        random.shuffle(main_rooms)
+        main_rooms = list(self.template.main_rooms)
+        self.rng.shuffle(main_rooms)
         
         for i, weapon in enumerate(self.weapons):
             room = main_rooms[i]  
-            room.add_weapon(weapon)
+            self.weapon_in_room(weapon, room)
+    
+    def character_room(self, character):
+        return self.rooms[self.character_positions[character.index]]
+    
+    def weapon_room(self, weapon):
+        position = self.weapon_positions[weapon.index]
+        return self.rooms[position] if position is not None else None
+    
+    def characters_in(self, room):
+        cards = self.occupancy[room.index] & self.deck.character_mask
+        return [self.characters[card] for card in self.deck.cards_in(cards)]
+    
+    def weapons_in(self, room):
+        cards = self.occupancy[room.index] & self.deck.weapon_mask
+        return [self.weapons[card - self.deck.first_weapon] for card in self.deck.cards_in(cards)]
+    
+    def _move_card(self, positions, index, card, target_room):
+        bit = 1 << card
+        old = positions[index]
+        if old is not None:
+            self.occupancy[old] &= ~bit
+        positions[index] = target_room.index
+        self.occupancy[target_room.index] |= bit
     
     def get_room_name(self, room_name):
-        for room in self.rooms:
-            if room.name.lower() == room_name.lower():
-                return room
-        return None
+        room_id = self.registry.room_id(room_name)
+        return self.rooms[room_id] if room_id is not None else None
     
     def get_character_name(self, character_name):
-        for character in self.characters:
-            if character.name.lower() == character_name.lower():
-                return character
-        return None
+        character_id = self.registry.character_id(character_name)
+        return self.characters[character_id] if character_id is not None else None
     
     def get_weapon_name(self, weapon_name):
-        for weapon in self.weapons:
-            if weapon.name.lower() == weapon_name.lower():
-                return weapon
-        return None
+        weapon_id = self.registry.weapon_id(weapon_name)
+        return self.weapons[weapon_id] if weapon_id is not None else None
     
     def character_in_room(self, character, target_room):
         if not character or not target_room:
             return False
         
-        if character.current_room:
-            character.current_room.character_remove(character)
+        self._move_card(self.character_positions, character.index,
+                        self.entity_cards[character], target_room)
+        return True
     
-        target_room.character_added(character)
-        character.move_to(target_room)
+    def weapon_in_room(self, weapon, target_room):
+        if not weapon or not target_room:
+            return False
+        
+        self._move_card(self.weapon_positions, weapon.index,
+                        self.entity_cards[weapon], target_room)
         return True
     
     def next_moves(self, current_room):
@@ -66,67 +195,75 @@ class Mansion:
     def is_valid_move(self, from_room, to_room):
         if not from_room or not to_room:
             return False
-        if to_room in from_room.rooms_connection:
-            return True
-        if from_room.secret_passage and from_room.secret_passage == to_room:
-            return True
-        
-        return False
+        return self.board.is_exit(from_room.index, to_room.index)
+    
+    def room_index(self, room):
+        return room.index
+    
+    def distance(self, from_room, to_room):
+        if not from_room or not to_room:
+            return None
+        return self.board.distance(self.room_index(from_room), self.room_index(to_room))
+    
+    def shortest_path(self, from_room, to_room):
+        if not from_room or not to_room:
+            return None
+        path = self.board.path(self.room_index(from_room), self.room_index(to_room))
+        if path is None:
+            return None
+        return [self.rooms[i] for i in path]
+    
+    def reachable_mask(self, room, moves):
+        if not room:
+            return 0
+        return self.board.reach_mask(self.room_index(room), moves)
+    
+    def reachable_rooms(self, room, moves):
+        mask = self.reachable_mask(room, moves)
+        return [self.rooms[i] for i in self.board.rooms_in_mask(mask)]
+    
+    def can_reach(self, from_room, to_room, moves):
+        if not to_room:
+            return False
+        return bool(self.reachable_mask(from_room, moves) >> self.room_index(to_room) & 1)
     
     def is_main_room(self, room):
         if hasattr(room, 'room_type'):
             return room.room_type == "main"
-        return room in self.different_room.values()
+        return room in self.template.main_rooms
     
     def display_room_info(self, room):
         if not room:
             return "Invalid room"
         
-        info = f"\n=== {room.name} ===\n"
-        
-        if room.characters:
-            char_names = [char.name for char in room.characters]
-            info += f"Characters: {', '.join(char_names)}\n"
-        else:
-            info += "Characters: None\n"
-    
-        if room.weapons:
-            weapon_names = [weapon.name for weapon in room.weapons]
-            info += f"Weapons: {', '.join(weapon_names)}\n"
-        else:
-            info += "Weapons: None\n"
+        lines = [f"\n=== {room.name} ==="]
         
-        if hasattr(room, 'room_type'):
-            info += f"Room Type: {'Main Room' if room.room_type == 'main' else 'Hallway'}\n"
-        else:
-            info += f"Room Type: {'Main Room' if self.is_main_room(room) else 'Hallway'}\n"
+        characters = self.characters_in(room)
+        lines.append(f"Characters: {', '.join(char.name for char in characters) or 'None'}")
+        weapons = self.weapons_in(room)
+        lines.append(f"Weapons: {', '.join(weapon.name for weapon in weapons) or 'None'}")
+        lines.append(f"Room Type: {'Main Room' if self.is_main_room(room) else 'Hallway'}")
         
         connected_names = [r.name for r in room.rooms_connection]
         if connected_names:
-            info += f"Connected to: {', '.join(connected_names)}\n"
+            lines.append(f"Connected to: {', '.join(connected_names)}")
         
         if room.secret_passage:
-            info += f"Secret passage to: {room.secret_passage.name}\n"
+            lines.append(f"Secret passage to: {room.secret_passage.name}")
         
-        return info
+        return "\n".join(lines) + "\n"
     
     def get_simple_map(self, current_room_name):
-        map_lines = [
-        "    [Conservatory] == [Ballroom] == [Kitchen]",
-        "         |                  |           |",
-        "         |                  |           |", 
-        "    [Library] == [Billiard] == [Dining] == [Kitchen]",
-        "         |                  |           |      |",
-        "         |                  |           |      |",
-        "      [Study] == [Hall] == [Lounge]     |      |",
-        "         |                              |      |",
-        "         └─────────── SECRET ───────────┘      |",
-        "         └───────────────── SECRET ───────────┘"
-        ]
+        layout = self.template.layout
+        map_lines = list(layout.map_lines)
+        if not map_lines:
+            map_lines.append(f"{layout.name}: {len(self.template.main_rooms)} rooms, "
+                             f"{len(self.rooms) - len(self.template.main_rooms)} hallways")
     
         # Add current position indicator
         map_lines.append("")
         map_lines.append(f"Current Position: {current_room_name}")
-        map_lines.append("Secret Passages: Study↔Kitchen, Conservatory↔Lounge")
+        if layout.legend:
+            map_lines.append(layout.legend)
     
-        return "\n".join(map_lines) 
\ No newline at end of file
+        return "\n".join(map_lines)
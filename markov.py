@@ -0,0 +1,121 @@
+import argparse
+import time
+from mansion import Mansion
+
+DIE_SIDES = 6
+
+
+def turn_matrix(board, target=None, sides=DIE_SIDES):
+    # matrix[i][j]: chance a turn that starts in room i ends in room j when every
+    # step picks a random exit and the walk stops on entering a main room (or target)
+    matrix = []
+    for start in range(board.size):
+        row = [0.0] * board.size
+        active = {start: 1.0}
+        for step in range(1, sides + 1):
+            moving = {}
+            for room, chance in active.items():
+                exits = board.exits(room)
+                if not exits:
+                    row[room] += chance
+                    continue
+                share = chance / len(exits)
+                for neighbour, cost in exits:
+                    if neighbour == target or board.is_main(neighbour):
+                        row[neighbour] += share
+                    else:
+                        moving[neighbour] = moving.get(neighbour, 0.0) + share
+            # Walks still going stop here if the die showed exactly this many steps
+            stop_chance = 1 / (sides - step + 1)
+            active = {}
+            for room, chance in moving.items():
+                row[room] += chance * stop_chance
+                if step < sides:
+                    active[room] = chance * (1 - stop_chance)
+        matrix.append(row)
+    return matrix
+
+
+def solve(matrix, vector):
+    size = len(vector)
+    rows = [list(matrix[i]) + [vector[i]] for i in range(size)]
+    for column in range(size):
+        pivot = max(range(column, size), key=lambda r: abs(rows[r][column]))
+        if abs(rows[pivot][column]) < 1e-12:
+            raise ValueError("singular system")
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+        pivot_row = rows[column]
+        scale = pivot_row[column]
+        for j in range(column, size + 1):
+            pivot_row[j] /= scale
+        for r in range(size):
+            if r != column:
+                factor = rows[r][column]
+                if factor:
+                    row = rows[r]
+                    for j in range(column, size + 1):
+                        row[j] -= factor * pivot_row[j]
+    return [rows[i][size] for i in range(size)]
+
+
+def expected_turns_to(board, target, sides=DIE_SIDES):
+    matrix = turn_matrix(board, target, sides)
+    # Solve h = 1 + Q h over the rooms that can still reach the target
+    states = [room for room in range(board.size)
+              if room != target and board.distance(room, target) is not None]
+    position = {room: i for i, room in enumerate(states)}
+    system = []
+    for room in states:
+        row = [0.0] * len(states)
+        for other, chance in enumerate(matrix[room]):
+            if other in position:
+                row[position[other]] -= chance
+        row[position[room]] += 1.0
+        system.append(row)
+
+    turns = [float("inf")] * board.size
+    turns[target] = 0.0
+    if states:
+        for room, value in zip(states, solve(system, [1.0] * len(states))):
+            turns[room] = value
+    return turns
+
+
+def expected_turns(board, sides=DIE_SIDES):
+    columns = [expected_turns_to(board, target, sides) for target in range(board.size)]
+    return [[columns[target][start] for target in range(board.size)]
+            for start in range(board.size)]
+
+
+def starting_room_report(mansion, sides=DIE_SIDES):
+    board = mansion.board
+    targets = [i for i in range(board.size) if board.is_main(i)]
+    columns = {target: expected_turns_to(board, target, sides) for target in targets}
+
+    report = {}
+    for character in mansion.characters:
+        start = mansion.room_index(character.starting_room)
+        report[character.name] = {board.names[target]: columns[target][start]
+                                  for target in targets}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Expected turns to reach each room")
+    parser.add_argument("--sides", type=int, default=DIE_SIDES)
+    args = parser.parse_args()
+
+    mansion = Mansion()
+    start = time.perf_counter()
+    report = starting_room_report(mansion, args.sides)
+    elapsed = time.perf_counter() - start
+
+    for character, turns in report.items():
+        print(f"\n{character} ({mansion.get_character_name(character).starting_room.name}):")
+        for room_name, value in sorted(turns.items(), key=lambda item: item[1]):
+            print(f"  {room_name:<15} {value:6.2f} turns")
+    print(f"\nComputed in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import functools
+import os
+import time
+from bisect import bisect_left
+from collections import Counter
+from events import FanoutSink
+from game import Game
+from mansion import Mansion
+
+PREFIX = "cluedo"
+# Upper bounds in seconds, from a microsecond up to a second
+LATENCY_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+                   1e-3, 1e-2, 1e-1, 1.0)
+
+# Methods timed once instrumentation is enabled; nothing is wrapped until then
+TIMED = {
+    Game: ("start_turn", "move_player", "go_to_room", "make_suggestion",
+           "make_accusation", "next_turn"),
+    Mansion: ("get_room_name", "get_character_name", "get_weapon_name",
+              "next_moves", "is_valid_move", "reachable_rooms"),
+}
+
+_originals = {}
+_default_metrics = None
+
+
+class Histogram:
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def cumulative(self):
+        # (upper bound, observations at or below it), ending with +Inf
+        running = 0
+        buckets = []
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            running += count
+            buckets.append((bound, running))
+        return buckets
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation
+        if not self.count:
+            return None
+        target = q * self.count
+        for bound, running in self.cumulative():
+            if running >= target:
+                return bound
+
+
+class Metrics:
+
+    def __init__(self):
+        self.counters = Counter()
+        self.gauges = {}
+        self.latency = {}
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+
+    def histogram(self, name):
+        histogram = self.latency.get(name)
+        if histogram is None:
+            histogram = self.latency[name] = Histogram()
+        return histogram
+
+    def reset(self):
+        self.counters.clear()
+        self.gauges.clear()
+        for histogram in self.latency.values():
+            histogram.__init__(histogram.bounds)
+
+    def snapshot(self):
+        return {
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges),
+            "latency": {
+                name: {
+                    "count": histogram.count,
+                    "sum": histogram.total,
+                    "p50": histogram.quantile(0.5),
+                    "p99": histogram.quantile(0.99),
+                    "buckets": histogram.cumulative(),
+                }
+                for name, histogram in self.latency.items()
+            },
+        }
+
+    def prometheus(self):
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            lines.append(f"{PREFIX}_{name}_total {value}")
+        for name, value in sorted(self.gauges.items()):
+            lines.append(f"# TYPE {PREFIX}_{name} gauge")
+            lines.append(f"{PREFIX}_{name} {value}")
+        if self.latency:
+            metric = f"{PREFIX}_call_seconds"
+            lines.append(f"# HELP {metric} Time spent in instrumented game calls")
+            lines.append(f"# TYPE {metric} histogram")
+            for name, histogram in sorted(self.latency.items()):
+                for bound, running in histogram.cumulative():
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f'{metric}_bucket{{method="{name}",le="{le}"}} {running}')
+                lines.append(f'{metric}_sum{{method="{name}"}} {histogram.total:.9f}')
+                lines.append(f'{metric}_count{{method="{name}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # Written aside and renamed so a scraper never reads half a file
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as f:
+            f.write(self.prometheus())
+        os.replace(temporary, path)
+
+
+class MetricsSink:
+    # Game-level counters, taken from the events a game already reports
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def __call__(self, event, data):
+        metrics = self.metrics
+        if event == "turn_started":
+            metrics.count("turns")
+        elif event == "suggestion_made":
+            metrics.count("suggestions")
+            if data["refuter"] is None:
+                metrics.count("unrefuted_suggestions")
+        elif event == "player_moved":
+            metrics.count("moves")
+            if data["secret_passage"]:
+                metrics.count("secret_passages")
+        elif event == "player_travelled":
+            metrics.count("travels")
+            # Secret passages are free, so they are not steps
+            metrics.count("travel_steps", len(data["path"]) - data["secret_passages"])
+            if data["secret_passages"]:
+                metrics.count("secret_passages", data["secret_passages"])
+        elif event == "accusation_made":
+            metrics.count("accusations")
+            if data["correct"]:
+                metrics.count("games_solved")
+
+
+def _timed(function, histogram):
+    clock = time.perf_counter
+
+    @functools.wraps(function)
+    def timed(*args, **kwargs):
+        start = clock()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            histogram.observe(clock() - start)
+    return timed
+
+
+def enable(metrics=None):
+    # Swap timed wrappers into the classes, so every game in the process is measured
+    global _default_metrics
+    disable()
+    metrics = metrics or get_metrics()
+    _default_metrics = metrics
+    for cls, names in TIMED.items():
+        for name in names:
+            function = cls.__dict__[name]
+            _originals[cls, name] = function
+            setattr(cls, name, _timed(function, metrics.histogram(f"{cls.__name__}.{name}")))
+    return metrics
+
+
+def disable():
+    for (cls, name), function in _originals.items():
+        setattr(cls, name, function)
+    _originals.clear()
+
+
+def enabled():
+    return bool(_originals)
+
+
+def watch(game, metrics=None):
+    metrics = metrics or get_metrics()
+    game.sink = FanoutSink(game.sink, MetricsSink(metrics))
+    return metrics
+
+
+def get_metrics():
+    global _default_metrics
+    if _default_metrics is None:
+        _default_metrics = Metrics()
+    return _default_metrics
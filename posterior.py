@@ -0,0 +1,152 @@
+from functools import lru_cache
+from cards import count_cards
+
+
+def _deal_steps(knowledge):
+    deck = knowledge.deck
+    envelope = knowledge.envelope
+    has = knowledge.has
+    lacks = knowledge.lacks
+
+    assigned = 0
+    for holder_cards in has:
+        assigned |= holder_cards
+
+    steps = []
+    # Rooms first: the widest category is then resolved near the root, where few states exist
+    for category in (deck.room_mask, deck.weapon_mask, deck.character_mask):
+        free_cards = deck.cards_in(category & ~assigned)
+        needs_envelope = not has[envelope] & category
+        if needs_envelope and not free_cards:
+            return None
+        for position, card in enumerate(free_cards):
+            eligible = tuple(seat for seat in range(knowledge.players)
+                             if not lacks[seat] >> card & 1)
+            envelope_ok = needs_envelope and not lacks[envelope] >> card & 1
+            last = position == len(free_cards) - 1
+            steps.append([card, eligible, envelope_ok, last, needs_envelope, {}, 0])
+    return steps
+
+
+def _attach_clauses(knowledge, steps):
+    clause_count = 0
+    step_of = {step[0]: index for index, step in enumerate(steps)}
+    for seat, clauses in enumerate(knowledge.clauses):
+        for clause in clauses:
+            indices = [step_of[card] for card in knowledge.deck.cards_in(clause) if card in step_of]
+            if not indices:
+                return None
+            bit = 1 << clause_count
+            clause_count += 1
+            for index in indices:
+                satisfies = steps[index][5]
+                satisfies[seat] = satisfies.get(seat, 0) | bit
+            steps[max(indices)][6] |= bit
+    return (1 << clause_count) - 1
+
+
+def _seat_groups(knowledge, steps):
+    # Seats with the same exclusions over the undealt cards and no clauses are interchangeable
+    free = 0
+    for step in steps:
+        free |= 1 << step[0]
+    groups = {}
+    for seat in range(knowledge.players):
+        if knowledge.clauses[seat]:
+            key = ("seat", seat)
+        else:
+            key = ("lacks", knowledge.lacks[seat] & free)
+        groups.setdefault(key, []).append(seat)
+    return [seats for seats in groups.values() if len(seats) > 1]
+
+
+def solution_counts(knowledge):
+    steps = _deal_steps(knowledge)
+    if steps is None:
+        return {}
+    open_clauses = _attach_clauses(knowledge, steps)
+    if open_clauses is None:
+        return {}
+
+    capacities = tuple(size - count_cards(knowledge.has[seat])
+                       for seat, size in enumerate(knowledge.hand_sizes[:knowledge.players]))
+    if min(capacities, default=0) < 0:
+        return {}
+    total_steps = len(steps)
+    groups = _seat_groups(knowledge, steps)
+
+    def canonical(capacities):
+        if not groups:
+            return capacities
+        capacities = list(capacities)
+        for seats in groups:
+            for seat, value in zip(seats, sorted(capacities[seat] for seat in seats)):
+                capacities[seat] = value
+        return tuple(capacities)
+
+    # Number of ways to deal the remaining cards, keyed by the envelope cards chosen on the way
+    @lru_cache(maxsize=None)
+    def suffix(index, capacities, open_clauses, filled):
+        if index == total_steps:
+            return {0: 1} if not any(capacities) and not open_clauses else {}
+
+        card, eligible, envelope_ok, last, needs_envelope, satisfies, expiring = steps[index]
+        next_filled = False if last else filled
+        result = {}
+
+        if not (last and needs_envelope and not filled):
+            tried = {}
+            for seat in eligible:
+                if not capacities[seat]:
+                    continue
+                remaining = open_clauses & ~satisfies.get(seat, 0)
+                if remaining & expiring:
+                    continue
+                next_capacities = canonical(
+                    capacities[:seat] + (capacities[seat] - 1,) + capacities[seat + 1:])
+                branch = (next_capacities, remaining)
+                tried[branch] = tried.get(branch, 0) + 1
+            for (next_capacities, remaining), ways in tried.items():
+                for key, count in suffix(index + 1, next_capacities, remaining, next_filled).items():
+                    result[key] = result.get(key, 0) + count * ways
+
+        if envelope_ok and not filled and not open_clauses & expiring:
+            bit = 1 << card
+            for key, count in suffix(index + 1, capacities, open_clauses, not last).items():
+                key |= bit
+                result[key] = result.get(key, 0) + count
+
+        return result
+
+    # A deal is consistent with a wrong accusation unless the accusation is its envelope
+    known = knowledge.has[knowledge.envelope]
+    wrong = set(knowledge.wrong_accusations)
+    counts = {}
+    for key, count in suffix(0, canonical(capacities), open_clauses, False).items():
+        solution = known | key
+        if solution not in wrong:
+            counts[solution] = count
+    return counts
+
+
+def solution_posterior(knowledge):
+    counts = solution_counts(knowledge)
+    total = sum(counts.values())
+    if not total:
+        return {}
+    return {solution: count / total for solution, count in counts.items()}
+
+
+def card_probabilities(posterior, deck):
+    probabilities = [0.0] * deck.size
+    for solution, probability in posterior.items():
+        for card in deck.cards_in(solution):
+            probabilities[card] += probability
+    return probabilities
+
+
+def most_likely_solution(posterior):
+    if not posterior:
+        return None, 0.0
+    solution = max(posterior, key=posterior.get)
+    return solution, posterior[solution]
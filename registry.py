@@ -0,0 +1,74 @@
+from layout import load_layout
+
+_default_registry = None
+
+
+def normalize_name(name):
+    return " ".join(name.strip().strip("\"'").split()).casefold()
+
+
+class Registry:
+
+    def __init__(self, room_names, character_names, weapon_names, main_room_names=None,
+                 room_aliases=None, character_aliases=None, weapon_aliases=None):
+        self.rooms = list(room_names)
+        self.characters = list(character_names)
+        self.weapons = list(weapon_names)
+
+        self.room_ids = self._build_lookup(self.rooms, room_aliases)
+        self.character_ids = self._build_lookup(self.characters, character_aliases)
+        self.weapon_ids = self._build_lookup(self.weapons, weapon_aliases)
+
+        if main_room_names is None:
+            main_room_names = self.rooms
+        self.main_rooms = [self.rooms.index(name) for name in main_room_names]
+
+    @classmethod
+    def for_layout(cls, layout):
+        return cls(
+            [room.name for room in layout.rooms],
+            [character.name for character in layout.characters],
+            [weapon.name for weapon in layout.weapons],
+            list(layout.different_room),
+            layout.aliases["rooms"],
+            layout.aliases["characters"],
+            layout.aliases["weapons"],
+        )
+
+    def _build_lookup(self, names, aliases):
+        lookup = {}
+        for entity_id, name in enumerate(names):
+            for alias in (aliases or {}).get(name, []):
+                lookup[normalize_name(alias)] = entity_id
+        # Real names always win over an alias that happens to collide
+        for entity_id, name in enumerate(names):
+            lookup[normalize_name(name)] = entity_id
+        return lookup
+
+    def room_id(self, name):
+        return self.room_ids.get(normalize_name(name))
+
+    def character_id(self, name):
+        return self.character_ids.get(normalize_name(name))
+
+    def weapon_id(self, name):
+        return self.weapon_ids.get(normalize_name(name))
+
+    def room_name(self, name):
+        room_id = self.room_id(name)
+        return self.rooms[room_id] if room_id is not None else None
+
+    def character_name(self, name):
+        character_id = self.character_id(name)
+        return self.characters[character_id] if character_id is not None else None
+
+    def weapon_name(self, name):
+        weapon_id = self.weapon_id(name)
+        return self.weapons[weapon_id] if weapon_id is not None else None
+
+
+def get_registry():
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = Registry.for_layout(load_layout())
+    return _default_registry
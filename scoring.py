@@ -0,0 +1,138 @@
+from math import log2
+from cards import count_cards
+
+
+def holder_probabilities(knowledge, envelope_probabilities=None):
+    # probabilities[card][holder], treating cards as independent; the envelope is the last holder
+    deck = knowledge.deck
+    holders = knowledge.players + 1
+    envelope = knowledge.envelope
+    capacity = [max(size - count_cards(knowledge.has[holder]), 0)
+                for holder, size in enumerate(knowledge.hand_sizes)]
+
+    probabilities = []
+    for card in range(deck.size):
+        row = [0.0] * holders
+        bit = 1 << card
+        known = knowledge.holder_of(card)
+        if known is not None:
+            row[known] = 1.0
+            probabilities.append(row)
+            continue
+
+        if envelope_probabilities is not None:
+            in_envelope = envelope_probabilities[card]
+        elif knowledge.lacks[envelope] & bit:
+            in_envelope = 0.0
+        else:
+            category = next(c for c in knowledge.categories if c & bit)
+            open_cards = count_cards(category & ~knowledge.lacks[envelope])
+            in_envelope = 1.0 / open_cards if open_cards else 0.0
+        row[envelope] = in_envelope
+
+        weights = [capacity[seat] if not knowledge.lacks[seat] & bit else 0
+                   for seat in range(knowledge.players)]
+        total = sum(weights)
+        if total:
+            for seat, weight in enumerate(weights):
+                row[seat] = (1.0 - in_envelope) * weight / total
+        else:
+            row[envelope] = 1.0
+        probabilities.append(row)
+    return probabilities
+
+
+def refutation_order(seat, players):
+    return [(seat + offset) % players for offset in range(1, players)]
+
+
+def card_columns(probabilities, order):
+    # For each card, the chance each seat in refutation order holds it, and the
+    # chance it is not with that seat or any seat before it
+    columns = []
+    for row in probabilities:
+        held = []
+        clear = []
+        remaining = 1.0
+        for seat in order:
+            remaining -= row[seat]
+            held.append(row[seat])
+            clear.append(remaining)
+        columns.append((held, clear))
+    return columns
+
+
+def shown_chances(first, second, third):
+    # Chance each of the three cards is the one shown, and that nobody refutes;
+    # a refuter holding several of them shows one at random
+    held_1, clear_1 = first
+    held_2, clear_2 = second
+    held_3, clear_3 = third
+    shown_1 = shown_2 = shown_3 = 0.0
+    before_1 = before_2 = before_3 = 1.0
+    for k in range(len(held_1)):
+        h1, h2, h3 = held_1[k], held_2[k], held_3[k]
+        a1, a2, a3 = clear_1[k], clear_2[k], clear_3[k]
+        if h1:
+            shown_1 += h1 * (a2 * a3 + (h2 * a3 + a2 * h3) / 2 + h2 * h3 / 3)
+        if h2:
+            shown_2 += h2 * (a1 * a3 + (h1 * a3 + a1 * h3) / 2 + h1 * h3 / 3)
+        if h3:
+            shown_3 += h3 * (a1 * a2 + (h1 * a2 + a1 * h2) / 2 + h1 * h2 / 3)
+        before_1, before_2, before_3 = a1, a2, a3
+    return shown_1, shown_2, shown_3, before_1 * before_2 * before_3
+
+
+def category_entropies(probabilities, knowledge):
+    # Entropy of the envelope card in each category, and how much of it is gone
+    # once a given card is ruled out of the envelope
+    envelope = knowledge.envelope
+    deck = knowledge.deck
+    category_entropy = [0.0] * deck.size
+    ruled_out_gain = [0.0] * deck.size
+    for category in knowledge.categories:
+        cards = deck.cards_in(category)
+        chances = [probabilities[card][envelope] for card in cards]
+        total = sum(chances)
+        if not total:
+            continue
+        chances = [chance / total for chance in chances]
+        entropy = -sum(chance * log2(chance) for chance in chances if chance > 0)
+        for card, chance in zip(cards, chances):
+            category_entropy[card] = entropy
+            if 0 < chance < 1:
+                remaining = 1 - chance
+                after = (entropy + chance * log2(chance)) / remaining + log2(remaining)
+                ruled_out_gain[card] = entropy - after
+    return category_entropy, ruled_out_gain
+
+
+def score_suggestions(knowledge, seat, room_card, envelope_probabilities=None):
+    # Expected drop, in bits, of the uncertainty about the solution
+    deck = knowledge.deck
+    probabilities = holder_probabilities(knowledge, envelope_probabilities)
+    columns = card_columns(probabilities, refutation_order(seat, knowledge.players))
+    category_entropy, ruled_out_gain = category_entropies(probabilities, knowledge)
+    own = knowledge.has[seat]
+
+    def solved_gain(card):
+        return 0.0 if own >> card & 1 else category_entropy[card]
+
+    room_column = columns[room_card]
+    room_solved = solved_gain(room_card)
+    room_ruled_out = ruled_out_gain[room_card]
+
+    scores = []
+    for character_card in deck.cards_in(deck.character_mask):
+        character_column = columns[character_card]
+        character_solved = solved_gain(character_card) + room_solved
+        character_ruled_out = ruled_out_gain[character_card]
+        for weapon_card in deck.cards_in(deck.weapon_mask):
+            shown_character, shown_weapon, shown_room, nobody = shown_chances(
+                character_column, columns[weapon_card], room_column)
+            gain = (shown_character * character_ruled_out +
+                    shown_weapon * ruled_out_gain[weapon_card] +
+                    shown_room * room_ruled_out +
+                    nobody * (character_solved + solved_gain(weapon_card)))
+            scores.append((gain, character_card, weapon_card))
+    return scores
@@ -0,0 +1,169 @@
+import shutil
+import sys
+
+CSI = "\x1b["
+HOME = CSI + "H"
+CLEAR_SCREEN = CSI + "2J"
+CLEAR_LINE = CSI + "K"
+CLEAR_BELOW = CSI + "J"
+
+TITLE = [
+    "    The Cluedo",
+    "    ================================================",
+    "    Type 'help' for the rules and commands",
+]
+
+
+def move_to(row):
+    return f"{CSI}{row + 1};1H"
+
+
+class Screen:
+    # Remembers the frame last drawn at the top of the terminal and rewrites
+    # only the lines that changed; text written under the frame is counted so
+    # a frame that may have scrolled away is redrawn in full
+
+    frames = True
+
+    def __init__(self, out=None, size=None):
+        self._out = out
+        self.size = size
+        self.lines = []
+        self.below = 0
+        self.width = 80
+        self.dirty = True
+
+    @property
+    def out(self):
+        return self._out or sys.stdout
+
+    def _rows(self, text):
+        return sum(len(line) // self.width + 1 for line in text.split("\n"))
+
+    def write(self, text=""):
+        text = str(text)
+        self.out.write(text + "\n")
+        self.below += self._rows(text)
+
+    def input(self, prompt=""):
+        self.out.flush()
+        self.below += self._rows(prompt)
+        return input(prompt)
+
+    def pause(self, prompt="Press Enter to continue..."):
+        self.input(prompt)
+
+    def clear(self):
+        self.dirty = True
+
+    def draw(self, lines):
+        out = self.out
+        if not out.isatty():
+            if lines:
+                out.write("\n".join(lines) + "\n")
+            self.lines = list(lines)
+            return
+
+        self.width, height = self.size or shutil.get_terminal_size()
+        full = (self.dirty
+                or len(self.lines) + self.below >= height
+                or len(lines) >= height
+                or any(len(line) >= self.width for line in lines))
+        if full:
+            parts = [HOME, CLEAR_SCREEN]
+            parts.extend(line + "\n" for line in lines)
+        else:
+            old = self.lines
+            parts = [move_to(row) + line + CLEAR_LINE
+                     for row, line in enumerate(lines)
+                     if row >= len(old) or old[row] != line]
+            parts.append(move_to(len(lines)) + CLEAR_BELOW)
+        out.write("".join(parts))
+        out.flush()
+        self.lines = list(lines)
+        self.below = 0
+        self.dirty = False
+
+    def show(self, view):
+        self.draw(view.frame())
+
+
+class ScriptedScreen:
+    # Same interface, fed from a command file or pipe: pauses are skipped,
+    # frames are not drawn, and the transcript holds each command ("> ...")
+    # followed by what the game answered, without blank lines
+
+    frames = False
+
+    def __init__(self, lines, out=None):
+        self.lines = iter(lines)
+        self._out = out
+
+    @property
+    def out(self):
+        return self._out or sys.stdout
+
+    def write(self, text=""):
+        for line in str(text).split("\n"):
+            if line.strip():
+                self.out.write(line + "\n")
+
+    def input(self, prompt=""):
+        for line in self.lines:
+            line = line.rstrip("\r\n")
+            if line.lstrip().startswith("#"):
+                continue
+            self.out.write(f"> {line}\n")
+            return line
+        raise EOFError("End of script")
+
+    def pause(self, prompt=""):
+        pass
+
+    def clear(self):
+        pass
+
+    def draw(self, lines):
+        pass
+
+    def show(self, view):
+        pass
+
+
+class GameView:
+    # Builds the frame shown at the top of each turn. Room info is kept until
+    # the room's occupancy mask changes and map text per room, so a redraw
+    # mostly reuses strings it already has
+
+    def __init__(self, game):
+        self.game = game
+        self._room_info = {}
+        self._maps = {}
+
+    def room_info(self, room):
+        occupancy = self.game.mansion.occupancy[room.index]
+        cached = self._room_info.get(room.index)
+        if cached is None or cached[0] != occupancy:
+            cached = (occupancy, self.game.mansion.display_room_info(room))
+            self._room_info[room.index] = cached
+        return cached[1]
+
+    def map(self, room):
+        text = self._maps.get(room.index)
+        if text is None:
+            text = self._maps[room.index] = self.game.mansion.get_simple_map(room.name)
+        return text
+
+    def status(self, player):
+        return self.game.display_player_status(player, self.room_info(player.position))
+
+    def frame(self):
+        game = self.game
+        player = game.get_current_player()
+        text = game.display_game_state()
+        if not player.bot and (game.remain_moves > 0 or player.must_suggest):
+            text += self.status(player)
+        return TITLE + text.split("\n")
+
+
+SCREEN = Screen()
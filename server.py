@@ -0,0 +1,494 @@
+import argparse
+import asyncio
+import json
+import os
+import struct
+from game import Game
+from main import parse_command, handle_suggestion_command, handle_accusation_command
+from turnclock import Alarm, TurnScheduler, TIME_BANK
+from journal import JournalReader, JournalWriter
+from hibernate import Hibernator, IDLE_TIME
+from metrics import enable, watch
+from snapshot import SNAPSHOT, MAX_PLAYERS
+
+METRICS_INTERVAL = 15.0
+
+# rolled flag, turn start, time banks, game snapshot: 97 bytes with six seats
+PARKED_TABLE = struct.Struct(f"<Bd{MAX_PLAYERS}f{SNAPSHOT.size}s")
+
+
+class Connection:
+
+    def __init__(self, writer=None):
+        self.writer = writer
+        self.table = None
+        self.seat = None
+        self.outbox = []
+
+    def send(self, kind, payload):
+        line = f"{kind} {json.dumps(payload)}\n"
+        if self.writer is None:
+            self.outbox.append(line)
+        else:
+            self.writer.write(line.encode())
+
+
+class Table:
+
+    def __init__(self, table_id, gamePlayers, rng=None, game=None):
+        self.id = table_id
+        self.seats = {}
+        self.rolled = False
+        self.clock = None
+        self.journal = None
+        if game is None:
+            game = Game(gamePlayers, sink=self.on_event, rng=rng)
+        else:
+            game.sink = self.on_event
+        self.game = game
+
+    def on_event(self, event, data):
+        if event == "cards_dealt":
+            return
+        if event == "turn_started":
+            self.rolled = False
+        payload = {"event": event, "table": self.id, **data}
+        # Only the suggester learns which card was shown
+        hidden = dict(payload, shown=None) if event == "suggestion_made" else payload
+        for seat, connection in self.seats.items():
+            if hidden is payload or data["seat"] == seat:
+                connection.send("event", payload)
+            else:
+                connection.send("event", hidden)
+
+    def free_seats(self):
+        return [seat for seat in range(len(self.game.players)) if seat not in self.seats]
+
+
+class GameServer:
+
+    def __init__(self, max_tables=None, rng=None, turn_time=None, time_bank=TIME_BANK,
+                 journal_dir=None, hibernate_path=None, idle_time=IDLE_TIME, max_live_tables=None,
+                 metrics_path=None, metrics_interval=METRICS_INTERVAL):
+        self.tables = {}
+        self.next_table_id = 1
+        self.max_tables = max_tables
+        self.rng = rng
+        self.turn_time = turn_time
+        self.time_bank = time_bank
+        self.scheduler = TurnScheduler() if turn_time else None
+        self.ticker = None
+        self.sweeper = None
+        self.exporter = None
+        self.metrics = enable() if metrics_path else None
+        self.metrics_path = metrics_path
+        self.metrics_interval = metrics_interval
+        self.hibernator = None
+        self.alarms = {}
+        if hibernate_path:
+            self.hibernator = Hibernator(hibernate_path, PARKED_TABLE, idle_time, max_live_tables)
+        self.journal_dir = journal_dir
+        if journal_dir:
+            os.makedirs(journal_dir, exist_ok=True)
+            self.recover_tables()
+        self.commands = {
+            "new": self.command_new,
+            "join": self.command_join,
+            "leave": self.command_leave,
+            "status": self.command_status,
+            "roll": self.command_roll,
+            "move": self.command_move,
+            "go": self.command_go,
+            "suggest": self.command_suggest,
+            "accuse": self.command_accuse,
+            "end": self.command_end,
+            "metrics": self.command_metrics,
+        }
+
+    def handle_line(self, connection, line):
+        parts = line.split()
+        if not parts:
+            return
+        command = self.commands.get(parts[0].lower())
+        if not command:
+            connection.send("error", {"message": f"Unknown command '{parts[0]}'"})
+            return
+        if connection.table is not None and connection.table.game is None:
+            self.wake_table(connection.table.id, connection.table)
+        try:
+            success, payload = command(connection, parts)
+        except Exception as e:
+            success, payload = False, {"message": f"Error: {e}"}
+        connection.send("ok" if success else "error", payload)
+        if self.hibernator:
+            if connection.table is not None:
+                self.hibernator.touch(connection.table.id)
+            self.park_idle_tables()
+
+    def table_count(self):
+        if not self.hibernator:
+            return len(self.tables)
+        parked = sum(1 for table_id in self.hibernator.slots if table_id not in self.tables)
+        return len(self.tables) + parked
+
+    def create_table(self, gamePlayers):
+        if self.max_tables is not None and self.table_count() >= self.max_tables:
+            raise ValueError("Server is full")
+        table = Table(self.next_table_id, gamePlayers, self.rng)
+        if self.journal_dir:
+            path = self.journal_path(table.id)
+            table.journal = JournalWriter(table.game, open(path, "wb"))
+        self._open_table(table)
+        self.next_table_id += 1
+        return table
+
+    def _open_table(self, table):
+        if self.metrics:
+            watch(table.game, self.metrics)
+        if self.scheduler:
+            table.clock = self.scheduler.watch(table.game, self.turn_time, self.time_bank)
+        self.tables[table.id] = table
+        if self.hibernator:
+            self.hibernator.touch(table.id)
+
+    def get_table(self, table_id):
+        table = self.tables.get(table_id)
+        if self.hibernator and table_id in self.hibernator and (table is None or table.game is None):
+            table = self.wake_table(table_id, table)
+        return table
+
+    def park_table(self, table):
+        # Keep only the snapshot; a table nobody sits at is dropped entirely.
+        # The turn deadline stays on the wheel and wakes the table when it passes
+        started = None
+        banks = []
+        if table.clock:
+            deadline = table.clock.deadline
+            started = table.clock.park()
+            banks = table.clock.banks
+            table.clock = None
+            if deadline is not None:
+                table_id = table.id
+                alarm = self.alarms[table_id] = Alarm(lambda: self.get_table(table_id))
+                self.scheduler.set_deadline(alarm, deadline)
+        banks = list(banks) + [0.0] * (MAX_PLAYERS - len(banks))
+        self.hibernator.store(table.id, table.rolled, started or 0.0, *banks, table.game.snapshot())
+        if table.journal:
+            table.journal.close()
+            table.journal = None
+        table.game = None
+        if not table.seats:
+            del self.tables[table.id]
+
+    def wake_table(self, table_id, table=None):
+        alarm = self.alarms.pop(table_id, None)
+        if alarm:
+            self.scheduler.cancel(alarm)
+        rolled, started, *banks, snapshot = self.hibernator.load(table_id)
+        game = Game.restore(snapshot, sink=None, rng=self.rng)
+        if table is None:
+            table = Table(table_id, len(game.players), game=game)
+        else:
+            table.game = game
+            game.sink = table.on_event
+        table.rolled = bool(rolled)
+        if self.journal_dir:
+            path = self.journal_path(table_id)
+            table.journal = JournalWriter(game, open(path, "ab"), header=False)
+        self._open_table(table)
+        if table.clock:
+            table.clock.banks = banks[:len(game.players)]
+            if not game.game_over:
+                table.clock.start_turn(started)
+        return table
+
+    def park_idle_tables(self):
+        for table_id in self.hibernator.evictions():
+            self.park_table(self.tables[table_id])
+
+    async def sweep_idle_tables(self):
+        while True:
+            await asyncio.sleep(self.hibernator.idle_time / 4)
+            self.park_idle_tables()
+
+    def write_metrics(self):
+        live = sum(1 for table in self.tables.values() if table.game is not None)
+        self.metrics.gauge("tables", self.table_count())
+        self.metrics.gauge("live_tables", live)
+        self.metrics.write_prometheus(self.metrics_path)
+
+    async def export_metrics(self):
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+            self.write_metrics()
+
+    def journal_path(self, table_id):
+        return os.path.join(self.journal_dir, f"table-{table_id}.clj")
+
+    def recover_tables(self):
+        # Replay the journals of games that were still running when the server stopped
+        for name in sorted(os.listdir(self.journal_dir)):
+            if not (name.startswith("table-") and name.endswith(".clj")):
+                continue
+            table_id = int(name[len("table-"):-len(".clj")])
+            path = os.path.join(self.journal_dir, name)
+            # Never hand out the id of a journal on disk, even one that cannot be read
+            self.next_table_id = max(self.next_table_id, table_id + 1)
+            if not os.path.getsize(path):
+                continue
+            try:
+                with JournalReader(path) as reader:
+                    game, end, rolled = reader.recover()
+                # Cut off a record the crash left half written, so new records line up
+                if end < os.path.getsize(path):
+                    os.truncate(path, end)
+            except Exception as e:
+                print(f"Skipping journal {name}: {e}")
+                continue
+            if game.game_over:
+                continue
+            table = Table(table_id, len(game.players), game=game)
+            table.rolled = rolled
+            table.journal = JournalWriter(game, open(path, "ab"), header=False)
+            self._open_table(table)
+
+    def close_table(self, table):
+        for connection in table.seats.values():
+            connection.table = None
+            connection.seat = None
+        if table.clock:
+            table.clock.stop()
+        if table.journal:
+            table.journal.close()
+        if self.hibernator:
+            self.hibernator.forget(table.id)
+        alarm = self.alarms.pop(table.id, None)
+        if alarm:
+            self.scheduler.cancel(alarm)
+        self.tables.pop(table.id, None)
+
+    def _player_turn(self, connection):
+        table = connection.table
+        if table is None:
+            return None, "Join a table first"
+        game = table.game
+        if game.game_over:
+            return None, "The game is over"
+        if game.current_player_index != connection.seat:
+            return None, f"It is {game.get_current_player().name}'s turn"
+        return game.players[connection.seat], None
+
+    def command_new(self, connection, parts):
+        if len(parts) != 2 or not parts[1].isdigit():
+            return False, {"message": "Use: new <players>"}
+        try:
+            table = self.create_table(int(parts[1]))
+        except ValueError as e:
+            return False, {"message": str(e)}
+        return True, {"table": table.id, "players": len(table.game.players)}
+
+    def command_join(self, connection, parts):
+        if len(parts) not in (2, 3) or not all(part.isdigit() for part in parts[1:]):
+            return False, {"message": "Use: join <table> [seat]"}
+        table = self.get_table(int(parts[1]))
+        if table is None:
+            return False, {"message": f"Table {parts[1]} not found"}
+        free_seats = table.free_seats()
+        seat = int(parts[2]) - 1 if len(parts) == 3 else (free_seats[0] if free_seats else None)
+        if seat not in free_seats:
+            return False, {"message": "Seat is not available"}
+
+        if connection.table is not None:
+            self.command_leave(connection, ["leave"])
+        connection.table = table
+        connection.seat = seat
+        table.seats[seat] = connection
+        player = table.game.players[seat]
+        return True, {
+            "table": table.id,
+            "seat": seat,
+            "player": player.name,
+            "character": player.character.name,
+            "cards": player.cards,
+        }
+
+    def command_leave(self, connection, parts):
+        table = connection.table
+        if table is None:
+            return False, {"message": "You are not at a table"}
+        table.seats.pop(connection.seat, None)
+        connection.table = None
+        connection.seat = None
+        if table.game is None and not table.seats:
+            del self.tables[table.id]
+        return True, {"table": table.id}
+
+    def command_status(self, connection, parts):
+        if connection.table is None:
+            return True, {"tables": self.table_count()}
+        table = connection.table
+        game = table.game
+        player = game.players[connection.seat]
+        return True, {
+            "message": game.display_player_status(player),
+            "turn": game.turn_count,
+            "current_seat": game.current_player_index,
+            "remain_moves": game.remain_moves,
+            "time_left": table.clock.time_left() if table.clock else None,
+            "time_bank": table.clock.banks[connection.seat] if table.clock else None,
+        }
+
+    def command_roll(self, connection, parts):
+        player, error = self._player_turn(connection)
+        if error:
+            return False, {"message": error}
+        table = connection.table
+        if table.rolled:
+            return False, {"message": "You already rolled this turn"}
+        table.rolled = True
+        dice_roll = table.game.start_turn()
+        return True, {"roll": dice_roll, "remain_moves": table.game.remain_moves}
+
+    def _move(self, connection, parts, move):
+        player, error = self._player_turn(connection)
+        if error:
+            return False, {"message": error}
+        if player.must_suggest:
+            return False, {"message": "Make your suggestion first"}
+        if len(parts) < 2:
+            return False, {"message": f"Use: {parts[0]} <room>"}
+        game = connection.table.game
+        command, error = parse_command(game, ' '.join(parts[1:]), parts[0].lower())
+        if error:
+            return False, {"message": error}
+        success, message, requires_suggestion = move(player, game.mansion.rooms[command.room].name)
+        return success, {
+            "message": message,
+            "position": player.position.name,
+            "remain_moves": connection.table.game.remain_moves,
+            "must_suggest": requires_suggestion,
+        }
+
+    def command_move(self, connection, parts):
+        table = connection.table
+        return self._move(connection, parts, table.game.move_player if table else None)
+
+    def command_go(self, connection, parts):
+        table = connection.table
+        return self._move(connection, parts, table.game.go_to_room if table else None)
+
+    def command_suggest(self, connection, parts):
+        player, error = self._player_turn(connection)
+        if error:
+            return False, {"message": error}
+        game = connection.table.game
+        if not player.must_suggest:
+            return False, {"message": "You can only suggest right after entering a room"}
+        success, message = handle_suggestion_command(game, player, parts)
+        return success, {"message": message}
+
+    def command_accuse(self, connection, parts):
+        player, error = self._player_turn(connection)
+        if error:
+            return False, {"message": error}
+        table = connection.table
+        game = table.game
+        success, message = handle_accusation_command(game, player, parts)
+        if success and player.eliminated and not game.game_over:
+            table.rolled = False
+            game.next_turn()
+        return success, {"message": message, "game_over": game.game_over, "winner": game.winner}
+
+    def command_end(self, connection, parts):
+        player, error = self._player_turn(connection)
+        if error:
+            return False, {"message": error}
+        if player.must_suggest:
+            return False, {"message": "You must make a suggestion before ending your turn"}
+        table = connection.table
+        table.rolled = False
+        table.game.next_turn()
+        return True, {"current_seat": table.game.current_player_index}
+
+    def command_metrics(self, connection, parts):
+        if not self.metrics:
+            return False, {"message": "Metrics are not enabled on this server"}
+        return True, self.metrics.snapshot()
+
+    def disconnect(self, connection):
+        if connection.table is not None:
+            self.command_leave(connection, ["leave"])
+
+    async def handle_connection(self, reader, writer):
+        connection = Connection(writer)
+        connection.send("ok", {"message": "Welcome to Cluedo", "tables": self.table_count()})
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.handle_line(connection, line.decode(errors="replace").strip())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.disconnect(connection)
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=7777):
+        if self.scheduler and self.ticker is None:
+            self.ticker = asyncio.create_task(self.scheduler.run())
+        if self.hibernator and self.sweeper is None:
+            self.sweeper = asyncio.create_task(self.sweep_idle_tables())
+        if self.metrics and self.exporter is None:
+            self.exporter = asyncio.create_task(self.export_metrics())
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+
+async def run_server(host, port, max_tables, turn_time=None, time_bank=TIME_BANK, journal_dir=None,
+                     hibernate_path=None, idle_time=IDLE_TIME, max_live_tables=None,
+                     metrics_path=None, metrics_interval=METRICS_INTERVAL):
+    game_server = GameServer(max_tables, turn_time=turn_time, time_bank=time_bank,
+                             journal_dir=journal_dir, hibernate_path=hibernate_path,
+                             idle_time=idle_time, max_live_tables=max_live_tables,
+                             metrics_path=metrics_path, metrics_interval=metrics_interval)
+    server = await game_server.serve(host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Cluedo server listening on {address[0]}:{address[1]}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host many Cluedo tables over TCP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument("--max-tables", type=int, default=None)
+    parser.add_argument("--turn-time", type=float, default=None,
+                        help="seconds per turn before the time bank is used (default: no clock)")
+    parser.add_argument("--time-bank", type=float, default=TIME_BANK)
+    parser.add_argument("--journal-dir", default=None,
+                        help="journal every table here and resume unfinished games on start")
+    parser.add_argument("--hibernate", default=None, metavar="PATH",
+                        help="park idle games in a memory-mapped file at PATH")
+    parser.add_argument("--idle-time", type=float, default=IDLE_TIME,
+                        help="seconds without a command before a game is parked")
+    parser.add_argument("--max-live-tables", "--max-live", type=int, default=None, metavar="N",
+                        help="most tables kept in memory, counted in tables rather than bytes; "
+                             "the least recently used beyond N are parked")
+    parser.add_argument("--metrics", default=None, metavar="PATH",
+                        help="time game calls and write Prometheus text metrics to PATH")
+    parser.add_argument("--metrics-interval", type=float, default=METRICS_INTERVAL,
+                        help="seconds between metrics writes")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run_server(args.host, args.port, args.max_tables, args.turn_time,
+                               args.time_bank, args.journal_dir, args.hibernate,
+                               args.idle_time, args.max_live_tables, args.metrics,
+                               args.metrics_interval))
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
+
+
+if __name__ == "__main__":
+    main()
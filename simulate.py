@@ -0,0 +1,256 @@
+import argparse
+import io
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from game import Game
+from knowledge import Knowledge
+from bots import MCTSBot, ITERATIONS, TIME_BUDGET
+from journal import JournalWriter
+from metrics import enable, watch
+
+
+def game_seed(master_seed, index):
+    return (master_seed << 32) | index
+
+
+def choose_suggestion(game, player, knowledge):
+    deck = game.mansion.deck
+    possible = knowledge.possible_solution()
+    characters = deck.cards_in(possible & deck.character_mask) or deck.cards_in(deck.character_mask)
+    weapons = deck.cards_in(possible & deck.weapon_mask) or deck.cards_in(deck.weapon_mask)
+    return deck.names[game.rng.choice(characters)], deck.names[game.rng.choice(weapons)]
+
+
+def choose_scored_suggestion(game, player, knowledge):
+    # About a turn shorter per game than choose_suggestion, at roughly half the throughput
+    candidates = game.evaluate_suggestions(player, knowledge)
+    best_gain = max(gain for _, _, gain in candidates)
+    best = [(character, weapon) for character, weapon, gain in candidates
+            if gain >= best_gain - 1e-9]
+    return game.rng.choice(best)
+
+
+def share_suggestion(knowledge, suggestion):
+    for seat_knowledge in knowledge:
+        shown = suggestion["shown"] if seat_knowledge.seat == suggestion["seat"] else None
+        seat_knowledge.observe_suggestion(suggestion["seat"], suggestion["cards"],
+                                          suggestion["refuter"], suggestion["passed"], shown)
+
+
+def play_turn(game, knowledge, scored=False):
+    player = game.get_current_player()
+    mansion = game.mansion
+
+    if player.bot:
+        previous_suggestion = game.last_suggestion
+        player.bot.play_turn(game)
+        if game.last_suggestion is not previous_suggestion:
+            share_suggestion(knowledge, game.last_suggestion)
+        return
+
+    solution = knowledge[player.seat].solution()
+    if solution is not None:
+        game.make_accusation(player, *mansion.deck.card_names(solution))
+        if not game.game_over:
+            for seat_knowledge in knowledge:
+                seat_knowledge.observe_accusation(solution, False)
+            game.next_turn()
+        return
+
+    game.start_turn()
+    previous_room = None
+
+    while game.remain_moves > 0:
+        targets = [room for room in mansion.reachable_rooms(player.position, game.remain_moves)
+                   if mansion.is_main_room(room)]
+        if targets:
+            target_room = game.rng.choice(targets)
+            success, message, requires_suggestion = game.go_to_room(player, target_room.name)
+        else:
+            moves = mansion.next_moves(player.position)
+            choices = [room for room in moves if room is not previous_room] or moves
+            target_room = game.rng.choice(choices)
+            previous_room = player.position
+            success, message, requires_suggestion = game.move_player(player, target_room.name)
+
+        if requires_suggestion:
+            choose = choose_scored_suggestion if scored else choose_suggestion
+            character_name, weapon_name = choose(game, player, knowledge[player.seat])
+            game.make_suggestion(player, character_name, weapon_name)
+            share_suggestion(knowledge, game.last_suggestion)
+            break
+
+    game.next_turn()
+
+
+def play_game(gamePlayers, max_turns=200, sink=None, seed=None, mcts_seats=(),
+              mcts_budget=TIME_BUDGET, mcts_iterations=ITERATIONS, mcts_workers=1, journal=False,
+              metrics=None, scored=False):
+    game = Game(gamePlayers, sink=sink, rng=random.Random(seed))
+    if metrics:
+        watch(game, metrics)
+    writer = JournalWriter(game, io.BytesIO(), flush=False) if journal else None
+    knowledge = [Knowledge.for_game(game, player.seat) for player in game.players]
+    for seat in mcts_seats:
+        game.players[seat].bot = MCTSBot(game, seat, knowledge[seat], mcts_budget, mcts_workers,
+                                         rng=random.Random(game.rng.getrandbits(64)),
+                                         iterations=mcts_iterations)
+
+    while not game.game_over and game.turn_count < max_turns:
+        play_turn(game, knowledge, scored)
+
+    result = {
+        "seed": seed,
+        "players": gamePlayers,
+        "turns": game.turn_count,
+        "winner": game.winner,
+        "solution": (
+            game.mansion.solution['character'].name,
+            game.mansion.solution['weapon'].name,
+            game.mansion.solution['room'].name,
+        ),
+    }
+    if writer:
+        result["journal"] = writer.file.getvalue()
+    return result
+
+
+def run_games(num_games, gamePlayers, max_turns=200, master_seed=0, **options):
+    for index in range(num_games):
+        yield play_game(gamePlayers, max_turns, seed=game_seed(master_seed, index), **options)
+
+
+def play_shard(gamePlayers, max_turns, master_seed, start, stop, options):
+    return [
+        play_game(gamePlayers, max_turns, seed=game_seed(master_seed, index), **options)
+        for index in range(start, stop)
+    ]
+
+
+def shard_ranges(num_games, shard_size):
+    return [(start, min(start + shard_size, num_games))
+            for start in range(0, num_games, shard_size)]
+
+
+def run_farm(num_games, gamePlayers, max_turns=200, master_seed=0,
+             workers=None, shard_size=500, **options):
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(play_shard, gamePlayers, max_turns, master_seed, start, stop, options)
+            for start, stop in shard_ranges(num_games, shard_size)
+        ]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+class Aggregate:
+
+    def __init__(self):
+        self.games = 0
+        self.unsolved = 0
+        self.total_turns = 0
+        self.wins_by_seat = Counter()
+        self.turns = Counter()
+        self.solutions = Counter()
+        self.characters = Counter()
+        self.weapons = Counter()
+        self.rooms = Counter()
+
+    def add(self, result):
+        self.games += 1
+        self.total_turns += result["turns"]
+        self.turns[result["turns"]] += 1
+        if result["winner"] is None:
+            self.unsolved += 1
+        else:
+            self.wins_by_seat[result["winner"]] += 1
+
+        character, weapon, room = result["solution"]
+        self.solutions[result["solution"]] += 1
+        self.characters[character] += 1
+        self.weapons[weapon] += 1
+        self.rooms[room] += 1
+
+    def win_rates(self):
+        if not self.games:
+            return {}
+        return {seat: wins / self.games for seat, wins in sorted(self.wins_by_seat.items())}
+
+    def summary(self):
+        lines = [f"Games: {self.games} (unsolved: {self.unsolved})"]
+        if self.games:
+            lines.append(f"Average turns: {self.total_turns / self.games:.1f}")
+        for seat, rate in self.win_rates().items():
+            lines.append(f"  Seat {seat + 1} win rate: {rate:.3f}")
+        for title, counts in (("Characters", self.characters),
+                              ("Weapons", self.weapons),
+                              ("Rooms", self.rooms)):
+            lines.append(f"{title}: " + ", ".join(
+                f"{name} {count}" for name, count in sorted(counts.items())))
+        return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play headless Cluedo games")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--max-turns", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes (0 = one per core)")
+    parser.add_argument("--shard-size", type=int, default=500)
+    parser.add_argument("--mcts-seats", default="",
+                        help="comma-separated seats (1-based) played by MCTS bots")
+    parser.add_argument("--mcts-iterations", type=int, default=ITERATIONS,
+                        help="rollouts per bot decision (0 = search for --mcts-budget seconds, "
+                             "which does not replay identically)")
+    parser.add_argument("--mcts-budget", type=float, default=TIME_BUDGET,
+                        help="seconds of search per bot decision with --mcts-iterations 0")
+    parser.add_argument("--scored", action="store_true",
+                        help="pick each suggestion by expected information gain (slower)")
+    parser.add_argument("--journal", default=None,
+                        help="append every game's journal to this archive file")
+    parser.add_argument("--metrics", default=None, metavar="PATH",
+                        help="time game calls and write Prometheus text metrics to PATH")
+    args = parser.parse_args()
+    if args.metrics and args.workers != 1:
+        parser.error("--metrics needs --workers 1; worker processes keep their own counts")
+
+    options = {
+        "mcts_seats": [int(seat) - 1 for seat in args.mcts_seats.split(",") if seat],
+        "mcts_budget": args.mcts_budget,
+        "mcts_iterations": args.mcts_iterations,
+        "journal": bool(args.journal),
+        "scored": args.scored,
+        "metrics": enable() if args.metrics else None,
+    }
+    if args.workers == 1:
+        results = run_games(args.games, args.players, args.max_turns, args.seed, **options)
+    else:
+        results = run_farm(args.games, args.players, args.max_turns, args.seed,
+                           args.workers or None, args.shard_size, **options)
+
+    archive = open(args.journal, "ab") if args.journal else None
+    aggregate = Aggregate()
+    start = time.perf_counter()
+    for result in results:
+        aggregate.add(result)
+        if archive:
+            archive.write(result["journal"])
+    elapsed = time.perf_counter() - start
+    if archive:
+        archive.close()
+
+    print(aggregate.summary())
+    print(f"\nPlayed {aggregate.games} games ({aggregate.total_turns} turns) in {elapsed:.2f}s")
+    print(f"{aggregate.games / elapsed:.0f} games/s, {aggregate.total_turns / elapsed:.0f} turns/s")
+    if args.metrics:
+        options["metrics"].write_prometheus(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import struct
+
+SNAPSHOT_VERSION = 1
+MAX_PLAYERS = 6
+NONE = 0xFF
+
+# version, players, current seat, remain_moves, game_over, winner,
+# must_suggest and eliminated seat bits, turn_count, solution ids,
+# character / weapon / player room indices, hands, last suggestion
+SNAPSHOT = struct.Struct("<8BI3B6B6B6B6I2BIB")
+
+
+def _byte(value):
+    return NONE if value is None else value
+
+
+def _value(byte):
+    return None if byte == NONE else byte
+
+
+def pack_state(game):
+    mansion = game.mansion
+    # The fixed layout holds six suspects and weapons, byte room indices and 32-bit hands
+    if (len(mansion.characters) != MAX_PLAYERS or len(mansion.weapons) != MAX_PLAYERS
+            or len(mansion.rooms) >= NONE or mansion.deck.size > 32):
+        raise ValueError("Snapshots need 6 characters, 6 weapons, fewer than 255 rooms "
+                         "and at most 32 cards")
+    players = game.players
+    must_suggest = 0
+    eliminated = 0
+    hands = [0] * MAX_PLAYERS
+    for player in players:
+        must_suggest |= player.must_suggest << player.seat
+        eliminated |= player.eliminated << player.seat
+        hands[player.seat] = player.hand
+
+    suggestion = game.last_suggestion or {"seat": None, "cards": 0, "refuter": None, "shown": None}
+    solution = mansion.solution
+    return SNAPSHOT.pack(
+        SNAPSHOT_VERSION,
+        len(players),
+        game.current_player_index,
+        game.remain_moves,
+        game.game_over,
+        _byte(game.winner),
+        must_suggest,
+        eliminated,
+        game.turn_count,
+        solution['character'].index,
+        solution['weapon'].index,
+        solution['room'].index,
+        *mansion.character_positions,
+        *[_byte(position) for position in mansion.weapon_positions],
+        *mansion.player_positions,
+        *hands,
+        _byte(suggestion["seat"]),
+        _byte(suggestion["refuter"]),
+        suggestion["cards"],
+        _byte(suggestion["shown"]),
+    )
+
+
+def unpack_state(data):
+    if len(data) != SNAPSHOT.size:
+        raise ValueError(f"Snapshot must be {SNAPSHOT.size} bytes, got {len(data)}")
+    fields = SNAPSHOT.unpack(data)
+    if fields[0] != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {fields[0]}")
+
+    players = fields[1]
+    if players < 3 or players > MAX_PLAYERS:
+        raise ValueError("Players must be between 3 and 6")
+    suggestion_seat, refuter, cards, shown = fields[36:40]
+    last_suggestion = None
+    if suggestion_seat != NONE:
+        last_suggestion = {
+            "seat": suggestion_seat,
+            "cards": cards,
+            "refuter": _value(refuter),
+            "shown": _value(shown),
+            "passed": _passed(suggestion_seat, _value(refuter), players),
+        }
+    return {
+        "players": players,
+        "current_player_index": fields[2],
+        "remain_moves": fields[3],
+        "game_over": bool(fields[4]),
+        "winner": _value(fields[5]),
+        "must_suggest": [bool(fields[6] >> seat & 1) for seat in range(players)],
+        "eliminated": [bool(fields[7] >> seat & 1) for seat in range(players)],
+        "turn_count": fields[8],
+        "solution": fields[9:12],
+        "character_positions": list(fields[12:18]),
+        "weapon_positions": [_value(position) for position in fields[18:24]],
+        "player_positions": list(fields[24:30]),
+        "hands": list(fields[30:30 + players]),
+        "last_suggestion": last_suggestion,
+    }
+
+
+def _passed(seat, refuter, players):
+    # Everyone between the suggester and the refuter passed, as in Game.refute
+    last = (refuter - seat) % players if refuter is not None else players
+    return [(seat + offset) % players for offset in range(1, last)]
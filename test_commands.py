@@ -0,0 +1,130 @@
+import random
+import pytest
+from commands import Grammar, deletions, edit_distance, get_grammar, max_typos, tokenize
+from registry import get_registry
+
+
+def reference_distance(a, b):
+    # Plain optimal string alignment distance, without the early exits
+    rows = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i in range(len(a) + 1):
+        rows[i][0] = i
+    for j in range(len(b) + 1):
+        rows[0][j] = j
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            rows[i][j] = min(rows[i - 1][j] + 1, rows[i][j - 1] + 1, rows[i - 1][j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                rows[i][j] = min(rows[i][j], rows[i - 2][j - 2] + 1)
+    return rows[-1][-1]
+
+
+def names(text):
+    grammar = get_grammar()
+    command, error = grammar.parse(text)
+    assert error is None, error
+    found = grammar.names(command)
+    return command.verb, found["character"], found["weapon"], found["room"]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('suggest "Miss Scarlett" Revolver', ("suggest", "Miss Scarlett", "Revolver", None)),
+    ("SUGGEST 'miss scarlett' revolver", ("suggest", "Miss Scarlett", "Revolver", None)),
+    ("suggest mustard candle", ("suggest", "Colonel Mustard", "Candlestick", None)),
+    ("accuse colonel mustard lead pipe dining room",
+     ("accuse", "Colonel Mustard", "Lead Pipe", "Dining Room")),
+    ("move hall", ("move", None, None, "Hall")),
+    ("go hallway_hall_lounge", ("go", None, None, "Hallway_Hall_Lounge")),
+    ("status", ("status", None, None, None)),
+])
+def test_names_and_aliases(text, expected):
+    assert names(text) == expected
+
+
+@pytest.mark.parametrize("text, expected, typos", [
+    ("go kitchn", ("go", None, None, "Kitchen"), 1),
+    ("go kitchne", ("go", None, None, "Kitchen"), 1),
+    ("go librar", ("go", None, None, "Library"), 1),
+    ("suggest scarlet revolvr", ("suggest", "Miss Scarlett", "Revolver", None), 2),
+    ("sugest plum rope", ("suggest", "Professor Plum", "Rope", None), 0),
+])
+def test_typos_are_forgiven(text, expected, typos):
+    assert names(text) == expected
+    assert get_grammar().parse(text)[0].typos == typos
+
+
+@pytest.mark.parametrize("text", [
+    "go ball",            # short words must match exactly: not Hall
+    "go bilard room",     # more typos than the word allows
+    "go",
+    "status now",
+    "suggest green",
+    "dance",
+])
+def test_bad_input_is_rejected(text):
+    command, error = get_grammar().parse(text)
+    assert command is None
+    assert error
+
+
+def test_verb_given_by_caller():
+    grammar = get_grammar()
+    command, error = grammar.parse("plum rope", "suggest")
+    assert error is None
+    assert grammar.names(command)["weapon"] == "Rope"
+
+
+def test_tokenize_strips_quotes_and_case():
+    assert tokenize("Suggest \"Mrs. White\" 'Lead Pipe'") == ["suggest", "mrs.", "white", "lead", "pipe"]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_edit_distance_matches_reference(seed):
+    rng = random.Random(seed)
+    for _ in range(300):
+        a = "".join(rng.choice("abcd") for _ in range(rng.randrange(8)))
+        b = "".join(rng.choice("abcd") for _ in range(rng.randrange(8)))
+        distance = reference_distance(a, b)
+        for limit in range(3):
+            # Beyond the limit only "too far" matters, not the exact value
+            result = edit_distance(a, b, limit)
+            if distance <= limit:
+                assert result == distance
+            else:
+                assert result > limit
+
+
+def test_deletion_index_finds_every_close_word():
+    # The symmetric-delete lookup must agree with comparing against every word
+    grammar = Grammar(get_registry())
+    words = grammar._words() | set(grammar.verbs)
+    rng = random.Random(0)
+    tokens = set()
+    for word in words:
+        for _ in range(4):
+            token = list(word)
+            for _ in range(rng.randrange(3)):
+                position = rng.randrange(len(token) + 1)
+                edit = rng.choice("dis")
+                if edit == "d" and position < len(token):
+                    del token[position]
+                elif edit == "i":
+                    token.insert(position, rng.choice("aeiourst"))
+                elif position < len(token):
+                    token[position] = rng.choice("aeiourst")
+            tokens.add("".join(token))
+    for token in tokens:
+        limit = max_typos(token)
+        expected = {}
+        if limit:
+            for word in words:
+                distance = reference_distance(token, word)
+                if max_typos(word) and distance <= limit:
+                    expected[word] = distance
+        assert grammar._similar(token) == expected, token
+
+
+def test_deletions():
+    assert deletions("abc", 1) == {"abc", "bc", "ac", "ab"}
+    assert deletions("ab", 2) == {"ab", "a", "b"}
@@ -0,0 +1,99 @@
+import io
+import os
+import random
+import pytest
+from game import Game
+from journal import JournalReader, JournalWriter, rebuild, replay, ROLL
+from knowledge import Knowledge
+from server import GameServer, Connection
+from simulate import play_turn
+
+
+def recorded_game(seed, turns=40):
+    # A headless game journaled in memory, with its snapshot at the start of every turn
+    game = Game(4, sink=None, rng=random.Random(seed))
+    writer = JournalWriter(game, io.BytesIO(), flush=False)
+    knowledge = [Knowledge.for_game(game, player.seat) for player in game.players]
+    snapshots = {0: game.snapshot()}
+    while not game.game_over and game.turn_count < turns:
+        play_turn(game, knowledge)
+        if not game.game_over:
+            snapshots[game.turn_count] = game.snapshot()
+    return game, writer.file.getvalue(), snapshots
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_replay_matches_live_game(seed):
+    game, journal, snapshots = recorded_game(seed)
+    assert replay(journal).snapshot() == game.snapshot()
+    # replay stops at the end of a turn, just before the turn change
+    for turn in range(len(snapshots) - 1):
+        replayed = replay(journal, turn)
+        assert replayed.turn_count == turn
+        replayed.next_turn()
+        assert replayed.snapshot() == snapshots[turn + 1]
+
+
+def test_archive_holds_games_back_to_back():
+    games = [recorded_game(seed) for seed in range(3)]
+    archive = b"".join(journal for _, journal, _ in games)
+    offsets = []
+    start = 0
+    for _, journal, _ in games:
+        offsets.append(start)
+        start += len(journal)
+    for offset, (game, _, _) in zip(offsets, games):
+        assert replay(archive, offset=offset).snapshot() == game.snapshot()
+
+
+def test_torn_tail_is_ignored_and_reported():
+    game, journal, _ = recorded_game(1)
+    recovered, end, _ = rebuild(journal + bytes((ROLL,)))
+    assert end == len(journal)
+    assert recovered.snapshot() == game.snapshot()
+
+
+def test_rolled_flag_follows_the_last_turn():
+    game = Game(3, sink=None, rng=random.Random(0))
+    writer = JournalWriter(game, io.BytesIO(), flush=False)
+    game.start_turn()
+    assert rebuild(writer.file.getvalue())[2]
+    game.next_turn()
+    assert not rebuild(writer.file.getvalue())[2]
+
+
+def test_reader_maps_the_file(tmp_path):
+    game, journal, _ = recorded_game(2)
+    path = tmp_path / "games.clj"
+    path.write_bytes(journal)
+    with JournalReader(str(path)) as reader:
+        assert list(reader.games()) == [0]
+        assert reader.replay().snapshot() == game.snapshot()
+
+
+def test_recovery_truncates_a_torn_journal(tmp_path):
+    journal_dir = str(tmp_path)
+    server = GameServer(journal_dir=journal_dir, rng=random.Random(1))
+    connection = Connection()
+    server.handle_line(connection, "new 3")
+    server.handle_line(connection, "join 1 1")
+    server.handle_line(connection, "roll")
+    server.tables[1].journal.close()
+    path = os.path.join(journal_dir, "table-1.clj")
+    size = os.path.getsize(path)
+    with open(path, "ab") as f:
+        f.write(b"C\x00\x01")
+    (tmp_path / "table-2.clj").write_bytes(b"not a journal")
+
+    server = GameServer(journal_dir=journal_dir, rng=random.Random(2))
+    assert os.path.getsize(path) == size
+    assert sorted(server.tables) == [1]
+    assert server.tables[1].rolled
+    assert server.next_table_id == 3
+
+    connection = Connection()
+    server.handle_line(connection, "join 1 1")
+    server.handle_line(connection, "end")
+    server.tables[1].journal.close()
+    server = GameServer(journal_dir=journal_dir)
+    assert server.tables[1].game.turn_count == 1
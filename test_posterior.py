@@ -0,0 +1,96 @@
+import random
+import pytest
+from cards import count_cards
+from game import Game
+from knowledge import Knowledge
+from posterior import solution_counts, solution_posterior
+
+
+def brute_force_counts(knowledge):
+    # Every way to hand out the unknown cards, counted per envelope
+    deck = knowledge.deck
+    envelope = knowledge.envelope
+    holders = knowledge.players + 1
+    known = 0
+    for cards in knowledge.has:
+        known |= cards
+    free = deck.cards_in(deck.full_mask & ~known)
+    capacity = [knowledge.hand_sizes[holder] - count_cards(knowledge.has[holder])
+                for holder in range(holders)]
+    hands = list(knowledge.has)
+    counts = {}
+
+    def deal(index):
+        if index == len(free):
+            if any(count_cards(hands[envelope] & category) != 1
+                   for category in knowledge.categories):
+                return
+            if hands[envelope] in knowledge.wrong_accusations:
+                return
+            if not all(clause & hands[seat] for seat in range(knowledge.players)
+                       for clause in knowledge.clauses[seat]):
+                return
+            counts[hands[envelope]] = counts.get(hands[envelope], 0) + 1
+            return
+        card = free[index]
+        for holder in range(holders):
+            if capacity[holder] and not knowledge.lacks[holder] >> card & 1:
+                capacity[holder] -= 1
+                hands[holder] |= 1 << card
+                deal(index + 1)
+                hands[holder] &= ~(1 << card)
+                capacity[holder] += 1
+
+    deal(0)
+    return counts
+
+
+def observed_knowledge(seed, shown_per_seat=3, suggestions=3):
+    # Seat 0's view of a real 3-player game after some cards were shown to it and
+    # it watched suggestions between the other players
+    rng = random.Random(seed)
+    game = Game(3, sink=None, rng=rng)
+    deck = game.mansion.deck
+    knowledge = Knowledge.for_game(game, 0)
+    for seat in (1, 2):
+        for card in rng.sample(deck.cards_in(game.players[seat].hand), shown_per_seat):
+            knowledge.observe_suggestion(0, 1 << card, seat, [], card)
+    categories = (deck.character_mask, deck.weapon_mask, deck.room_mask)
+    for _ in range(suggestions):
+        cards = 0
+        for category in categories:
+            cards |= 1 << rng.choice(deck.cards_in(category))
+        refuter, _, passed = game.refute(1, cards)
+        knowledge.observe_suggestion(1, cards, refuter, passed)
+    return game, knowledge
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("shown_per_seat, suggestions", [(3, 3), (2, 5)])
+def test_counts_match_brute_force(seed, shown_per_seat, suggestions):
+    game, knowledge = observed_knowledge(seed, shown_per_seat, suggestions)
+    assert solution_counts(knowledge) == brute_force_counts(knowledge)
+
+
+def test_posterior_sums_to_one_and_holds_the_solution():
+    game, knowledge = observed_knowledge(1)
+    posterior = solution_posterior(knowledge)
+    assert sum(posterior.values()) == pytest.approx(1.0)
+    assert posterior[game.mansion.solution_mask] > 0
+
+
+def test_wrong_accusation_is_ruled_out():
+    game, knowledge = observed_knowledge(2)
+    solution = game.mansion.solution_mask
+    wrong = next(key for key in solution_posterior(knowledge) if key != solution)
+    knowledge.observe_accusation(wrong, False)
+    posterior = solution_posterior(knowledge)
+    assert wrong not in posterior
+    assert sum(posterior.values()) == pytest.approx(1.0)
+    assert solution_counts(knowledge) == brute_force_counts(knowledge)
+
+
+def test_known_solution_is_certain():
+    game, knowledge = observed_knowledge(3)
+    knowledge.observe_accusation(game.mansion.solution_mask, True)
+    assert solution_posterior(knowledge) == {game.mansion.solution_mask: 1.0}
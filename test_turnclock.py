@@ -0,0 +1,108 @@
+import random
+import pytest
+from game import Game
+from turnclock import TimerWheel, TurnScheduler
+
+
+class NaiveTimers:
+    # Reference model: every timer is checked on every advance
+
+    def __init__(self):
+        self.timers = {}
+        self.now = 0
+
+    def schedule(self, key, tick):
+        self.timers[key] = max(tick, self.now + 1)
+
+    def cancel(self, key):
+        self.timers.pop(key, None)
+
+    def advance(self, tick):
+        self.now = max(self.now, tick)
+        expired = [key for key, due in self.timers.items() if due <= self.now]
+        for key in expired:
+            del self.timers[key]
+        return expired
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_wheel_matches_naive_model(seed):
+    rng = random.Random(seed)
+    wheel = TimerWheel(slots=8, levels=3)
+    naive = NaiveTimers()
+    for _ in range(400):
+        action = rng.random()
+        key = rng.randrange(50)
+        if action < 0.5:
+            # Far enough ahead to land on every level and past the top one
+            tick = naive.now + rng.choice((0, 1, 2, 7, 8, 9, 63, 64, 65, 511, 600))
+            wheel.schedule(key, tick)
+            naive.schedule(key, tick)
+        elif action < 0.65:
+            wheel.cancel(key)
+            naive.cancel(key)
+        else:
+            tick = naive.now + rng.choice((1, 1, 3, 8, 40, 200))
+            assert sorted(wheel.advance(tick)) == sorted(naive.advance(tick))
+        assert len(wheel) == len(naive.timers)
+    assert sorted(wheel.advance(naive.now + 10000)) == sorted(naive.advance(naive.now + 10000))
+    assert not len(wheel)
+
+
+def test_rescheduling_replaces_the_old_deadline():
+    wheel = TimerWheel(slots=8, levels=2)
+    wheel.schedule("a", 5)
+    wheel.schedule("a", 20)
+    assert wheel.advance(10) == []
+    assert wheel.advance(20) == ["a"]
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self):
+        return self.time
+
+
+def watched_game(turn_time=10.0, time_bank=5.0):
+    clock = FakeClock()
+    scheduler = TurnScheduler(tick=0.1, clock=clock)
+    game = Game(3, sink=None, rng=random.Random(0))
+    return clock, scheduler, game, scheduler.watch(game, turn_time, time_bank)
+
+
+def run_until(clock, scheduler, time):
+    while clock.time < time:
+        clock.time = round(clock.time + 0.1, 6)
+        scheduler.poll()
+
+
+def test_turn_times_out_after_turn_time_and_bank():
+    clock, scheduler, game, turn_clock = watched_game()
+    run_until(clock, scheduler, 14.9)
+    assert game.turn_count == 0
+    run_until(clock, scheduler, 15.1)
+    assert game.turn_count == 1
+    assert turn_clock.banks[0] == 0.0
+    assert turn_clock.timeouts == 1
+
+
+def test_overrun_is_charged_to_the_bank():
+    clock, scheduler, game, turn_clock = watched_game()
+    run_until(clock, scheduler, 12.0)
+    game.next_turn()
+    assert turn_clock.banks[0] == pytest.approx(3.0)
+    assert turn_clock.seat == 1
+    assert turn_clock.time_left() == pytest.approx(15.0)
+
+
+def test_timed_out_suggestion_is_made_for_the_player():
+    clock, scheduler, game, turn_clock = watched_game()
+    player = game.players[0]
+    player.position = game.mansion.template.main_rooms[0]
+    player.must_suggest = True
+    run_until(clock, scheduler, 15.1)
+    assert not player.must_suggest
+    assert game.last_suggestion["seat"] == 0
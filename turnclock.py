@@ -0,0 +1,211 @@
+import asyncio
+import math
+import time
+from events import FanoutSink
+
+TICK = 0.1
+WHEEL_SLOTS = 64
+WHEEL_LEVELS = 4
+TURN_TIME = 60.0
+TIME_BANK = 120.0
+
+
+class TimerWheel:
+    # Hierarchical timer wheel counting in whole ticks. Level n holds timers due
+    # less than slots**(n+1) ticks away; a slot is moved down a level when the
+    # wheel turns onto it, so scheduling, cancelling and ticking are all O(1)
+
+    def __init__(self, slots=WHEEL_SLOTS, levels=WHEEL_LEVELS):
+        self.slots = slots
+        self.levels = levels
+        self.wheels = [[{} for _ in range(slots)] for _ in range(levels)]
+        self.timers = {}
+        self.now = 0
+
+    def __len__(self):
+        return len(self.timers)
+
+    def __contains__(self, key):
+        return key in self.timers
+
+    def schedule(self, key, tick):
+        self.cancel(key)
+        self._place(key, max(tick, self.now + 1))
+
+    def cancel(self, key):
+        place = self.timers.pop(key, None)
+        if place is not None:
+            level, slot = place
+            del self.wheels[level][slot][key]
+
+    def _place(self, key, tick):
+        delay = tick - self.now
+        level = 0
+        span = self.slots
+        while delay >= span and level < self.levels - 1:
+            level += 1
+            span *= self.slots
+        slot = tick // (span // self.slots) % self.slots
+        self.wheels[level][slot][key] = tick
+        self.timers[key] = (level, slot)
+
+    def _cascade(self):
+        for level in range(self.levels - 1, 0, -1):
+            span = self.slots ** level
+            if self.now % span:
+                continue
+            slot = self.now // span % self.slots
+            timers = self.wheels[level][slot]
+            if timers:
+                self.wheels[level][slot] = {}
+                for key, tick in timers.items():
+                    self._place(key, tick)
+
+    def advance(self, tick):
+        # Turn the wheel up to tick and return the keys that fell due
+        expired = []
+        while self.now < tick:
+            if not self.timers:
+                self.now = tick
+                break
+            self.now += 1
+            self._cascade()
+            slot = self.now % self.slots
+            timers = self.wheels[0][slot]
+            if timers:
+                self.wheels[0][slot] = {}
+                for key in timers:
+                    del self.timers[key]
+                    expired.append(key)
+        return expired
+
+
+def default_suggestion(game, player):
+    mansion = game.mansion
+    character = game.rng.choice(mansion.characters)
+    weapon = game.rng.choice(mansion.weapons)
+    return character.name, weapon.name
+
+
+class TurnClock:
+    # Every turn gets turn_time seconds; time beyond that comes out of the
+    # player's bank, and once both are gone the turn is played out for them
+
+    def __init__(self, scheduler, game, turn_time=TURN_TIME, time_bank=TIME_BANK):
+        self.scheduler = scheduler
+        self.game = game
+        self.turn_time = turn_time
+        self.banks = [time_bank] * len(game.players)
+        self.seat = None
+        self.started = 0.0
+        self.deadline = None
+        self.timeouts = 0
+
+    def __call__(self, event, data):
+        if event == "turn_started":
+            self.start_turn()
+        elif event == "accusation_made" and self.game.game_over:
+            self.stop()
+
+    def start_turn(self, started=None):
+        # started resumes a turn that began earlier, such as one parked and woken
+        now = self.scheduler.now()
+        self._charge(now)
+        self.seat = self.game.current_player_index
+        self.started = now if started is None else started
+        self.deadline = self.started + self.turn_time + self.banks[self.seat]
+        self.scheduler.set_deadline(self, self.deadline)
+
+    def stop(self):
+        self._charge(self.scheduler.now())
+        self.seat = None
+        self.deadline = None
+        self.scheduler.cancel(self)
+
+    def park(self):
+        # Stop the clock, charging the bank for the turn so far, and return the
+        # start time that gives the same deadline when passed to start_turn
+        if self.seat is None:
+            self.stop()
+            return None
+        started = max(self.started, self.scheduler.now() - self.turn_time)
+        self.stop()
+        return started
+
+    def _charge(self, now):
+        if self.seat is None:
+            return
+        overrun = now - self.started - self.turn_time
+        if overrun > 0:
+            self.banks[self.seat] = max(self.banks[self.seat] - overrun, 0.0)
+
+    def time_left(self):
+        if self.deadline is None:
+            return None
+        return max(self.deadline - self.scheduler.now(), 0.0)
+
+    def expire(self):
+        game = self.game
+        if game.game_over:
+            self.stop()
+            return
+        player = game.get_current_player()
+        self.banks[self.seat] = 0.0
+        self.timeouts += 1
+        if game.sink:
+            game.sink("turn_timed_out", {
+                "player": player.name,
+                "seat": player.seat,
+                "turn": game.turn_count,
+                "must_suggest": player.must_suggest,
+            })
+        if player.must_suggest:
+            game.make_suggestion(player, *default_suggestion(game, player))
+        game.next_turn()
+
+
+class Alarm:
+    # A wheel entry for a deadline with no turn clock behind it, such as the
+    # turn of a parked table
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def expire(self):
+        self.callback()
+
+
+class TurnScheduler:
+
+    def __init__(self, tick=TICK, clock=time.monotonic, slots=WHEEL_SLOTS, levels=WHEEL_LEVELS):
+        self.tick = tick
+        self.clock = clock
+        self.origin = clock()
+        self.wheel = TimerWheel(slots, levels)
+
+    def now(self):
+        return self.clock() - self.origin
+
+    def watch(self, game, turn_time=TURN_TIME, time_bank=TIME_BANK):
+        turn_clock = TurnClock(self, game, turn_time, time_bank)
+        game.sink = FanoutSink(game.sink, turn_clock)
+        if not game.game_over:
+            turn_clock.start_turn()
+        return turn_clock
+
+    def set_deadline(self, turn_clock, deadline):
+        self.wheel.schedule(turn_clock, math.ceil(deadline / self.tick))
+
+    def cancel(self, turn_clock):
+        self.wheel.cancel(turn_clock)
+
+    def poll(self):
+        expired = self.wheel.advance(int(self.now() / self.tick))
+        for turn_clock in expired:
+            turn_clock.expire()
+        return len(expired)
+
+    async def run(self):
+        while True:
+            self.poll()
+            await asyncio.sleep(self.tick)